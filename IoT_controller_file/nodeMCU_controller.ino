@@ -1,13 +1,41 @@
 #include <ESP8266WiFi.h>
 #include <ESP8266HTTPClient.h>
-#include <ArduinoJson.h>
 
 // WiFi credentials
 const char* ssid = "YOUR_WIFI_SSID";
 const char* password = "YOUR_WIFI_PASSWORD";
 
 // Cloud server details
-const char* serverUrl = "http://your-cloud-server.com/api/sensor-data";
+const char* serverUrl = "http://your-cloud-server.com/api/sensor/data";
+
+// Retries when the server signals backpressure (503 + Retry-After)
+const int maxSendAttempts = 3;
+
+// Device identity sent in every frame header
+const char* deviceId = "nodeMCU_001";
+
+// Binary frame layout, see backend_files/wire_format.py:
+// header '<2sBBH' (magic "SA", version, device id length, record count),
+// device id bytes, then one 22-byte record per reading
+const uint8_t frameVersion = 1;
+
+#pragma pack(push, 1)
+struct ReadingRecord {
+  uint32_t ageSeconds;  // filled in when the frame is sent
+  float moisture;
+  float temperature;
+  float humidity;
+  int16_t nitrogen;
+  int16_t phosphorus;
+  int16_t potassium;
+};
+#pragma pack(pop)
+
+// Readings that failed to send are kept and uploaded together in one frame
+const int maxPending = 24;
+ReadingRecord pending[maxPending];
+unsigned long pendingTakenAt[maxPending];
+int pendingCount = 0;
 
 // Sensor pins
 const int moisturePin = A0;
@@ -27,45 +55,63 @@ void setup() {
 }
 
 void loop() {
+  // Read sensor data
+  int moistureValue = analogRead(moisturePin);
+  float moisturePercent = (1023.0 - moistureValue) * 100.0 / 1023.0;
+  
+  // In a real implementation, you would use DHT and NPK libraries
+  ReadingRecord record;
+  record.moisture = moisturePercent;
+  record.temperature = readDHTTemperature();
+  record.humidity = readDHTHumidity();
+  record.nitrogen = readNitrogen();
+  record.phosphorus = readPhosphorus();
+  record.potassium = readPotassium();
+  
+  // Kept until the server acknowledges it, even while WiFi is down
+  queueReading(record);
+  
   if (WiFi.status() == WL_CONNECTED) {
     HTTPClient http;
     http.begin(serverUrl);
-    http.addHeader("Content-Type", "application/json");
-    
-    // Read sensor data
-    int moistureValue = analogRead(moisturePin);
-    float moisturePercent = (1023.0 - moistureValue) * 100.0 / 1023.0;
-    
-    // In a real implementation, you would use DHT and NPK libraries
-    float temperature = readDHTTemperature();
-    float humidity = readDHTHumidity();
-    int nitrogen = readNitrogen();
-    int phosphorus = readPhosphorus();
-    int potassium = readPotassium();
-    
-    // Create JSON payload
-    StaticJsonDocument<200> doc;
-    doc["moisture"] = moisturePercent;
-    doc["temperature"] = temperature;
-    doc["humidity"] = humidity;
-    doc["nitrogen"] = nitrogen;
-    doc["phosphorus"] = phosphorus;
-    doc["potassium"] = potassium;
-    doc["device_id"] = "nodeMCU_001";
+    http.addHeader("Content-Type", "application/x-sensor-frame");
     
-    String jsonString;
-    serializeJson(doc, jsonString);
+    // Pack every pending reading into a single frame
+    uint8_t frame[6 + 32 + maxPending * sizeof(ReadingRecord)];
+    size_t frameLength = buildFrame(frame);
     
-    // Send POST request
-    int httpResponseCode = http.POST(jsonString);
+    // Send POST request; the server answers 201 (stored) or 202 (queued)
+    const char* headerKeys[] = {"Retry-After"};
+    http.collectHeaders(headerKeys, 1);
     
-    if (httpResponseCode > 0) {
-      String response = http.getString();
-      Serial.println(httpResponseCode);
-      Serial.println(response);
-    } else {
-      Serial.print("Error on sending POST: ");
-      Serial.println(httpResponseCode);
+    for (int attempt = 1; attempt <= maxSendAttempts; attempt++) {
+      int httpResponseCode = http.POST(frame, frameLength);
+      
+      if (httpResponseCode == 503 && attempt < maxSendAttempts) {
+        // Ingest queue is full: wait as instructed and resend the same frame
+        int retryAfter = http.header("Retry-After").toInt();
+        if (retryAfter <= 0) {
+          retryAfter = 5;
+        }
+        Serial.print("Server busy, retrying in ");
+        Serial.println(retryAfter);
+        delay(retryAfter * 1000UL);
+        continue;
+      }
+      
+      if (httpResponseCode >= 200 && httpResponseCode < 300) {
+        // Stored (201/207) or queued (202): drop the sent readings
+        pendingCount = 0;
+        Serial.println(httpResponseCode);
+      } else if (httpResponseCode > 0) {
+        String response = http.getString();
+        Serial.println(httpResponseCode);
+        Serial.println(response);
+      } else {
+        Serial.print("Error on sending POST: ");
+        Serial.println(httpResponseCode);
+      }
+      break;
     }
     
     http.end();
@@ -74,6 +120,41 @@ void loop() {
   delay(300000); // Wait for 5 minutes before next reading
 }
 
+void queueReading(const ReadingRecord& record) {
+  // When the buffer is full, the oldest reading makes room for the newest
+  if (pendingCount == maxPending) {
+    memmove(pending, pending + 1, (maxPending - 1) * sizeof(ReadingRecord));
+    memmove(pendingTakenAt, pendingTakenAt + 1, (maxPending - 1) * sizeof(unsigned long));
+    pendingCount--;
+  }
+  
+  pending[pendingCount] = record;
+  pendingTakenAt[pendingCount] = millis();
+  pendingCount++;
+}
+
+size_t buildFrame(uint8_t* frame) {
+  uint8_t idLength = min(strlen(deviceId), (size_t) 32);
+  uint16_t count = pendingCount;
+  unsigned long now = millis();
+  
+  frame[0] = 'S';
+  frame[1] = 'A';
+  frame[2] = frameVersion;
+  frame[3] = idLength;
+  memcpy(frame + 4, &count, sizeof(count));  // ESP8266 is little-endian
+  memcpy(frame + 6, deviceId, idLength);
+  
+  size_t offset = 6 + idLength;
+  for (int i = 0; i < pendingCount; i++) {
+    pending[i].ageSeconds = (now - pendingTakenAt[i]) / 1000;
+    memcpy(frame + offset, &pending[i], sizeof(ReadingRecord));
+    offset += sizeof(ReadingRecord);
+  }
+  
+  return offset;
+}
+
 // Placeholder functions - in real implementation, use proper libraries
 float readDHTTemperature() {
   return random(100, 400) / 10.0;
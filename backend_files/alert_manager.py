@@ -0,0 +1,155 @@
+from datetime import datetime
+import threading
+import time
+from backend.models import Alert
+from backend.utils.database import db
+from cloud_processing.analytics_engine import AnalyticsEngine
+
+# Rows written before alerts carried a condition are matched by message
+LEGACY_CONDITIONS = {
+    'Water stress detected - irrigation recommended': 'water_stress'
+}
+LEGACY_CONDITIONS.update({
+    message: f'low_{nutrient}' for nutrient, _, message in AnalyticsEngine.NUTRIENT_THRESHOLDS
+})
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        if self.tokens < 1:
+            return False
+        
+        self.tokens -= 1
+        return True
+
+class AlertManager:
+    def __init__(self, rate_per_hour=12, burst=5):
+        # Turns the engine's per-reading active conditions into alert rows:
+        # one open row per (device, condition), touched while the condition
+        # holds and resolved when the engine clears it. New rows are limited
+        # per device so a flapping sensor cannot flood the table.
+        self.rate = rate_per_hour / 3600.0
+        self.burst = burst
+        self.buckets = {}
+        self.suppressed = 0
+        self.lock = threading.Lock()
+    
+    def _allow(self, device_id):
+        with self.lock:
+            bucket = self.buckets.get(device_id)
+            if bucket is None:
+                bucket = self.buckets[device_id] = TokenBucket(self.rate, self.burst)
+            
+            if bucket.take():
+                return True
+            
+            self.suppressed += 1
+            return False
+    
+    def load_open(self, device_ids):
+        """Open alerts keyed by (device_id, condition), coalescing duplicates"""
+        rows = Alert.query.filter(
+            Alert.device_id.in_(list(device_ids)),
+            Alert.resolved == False
+        ).order_by(Alert.timestamp.desc(), Alert.id.desc()).all()
+        
+        open_alerts = {}
+        for alert in rows:
+            condition = alert.condition or LEGACY_CONDITIONS.get(alert.message)
+            if condition is None:
+                continue
+            
+            key = (alert.device_id, condition)
+            if key in open_alerts:
+                # Older duplicate from before deduplication: fold it into the newest
+                newest = open_alerts[key]
+                newest.occurrences = (newest.occurrences or 1) + (alert.occurrences or 1)
+                alert.resolved = True
+                alert.resolved_at = newest.last_seen or newest.timestamp
+                alert.updated_at = datetime.utcnow()
+                continue
+            
+            alert.condition = condition
+            open_alerts[key] = alert
+        
+        return open_alerts
+    
+    def apply(self, rows, batch_alerts):
+        """Open, touch and resolve alert rows for a batch; returns (opened, resolved)"""
+        open_alerts = self.load_open({row['device_id'] for row in rows})
+        opened = []
+        resolved = []
+        
+        # Same order the engine evaluated them in: oldest first
+        for index in sorted(range(len(rows)), key=lambda i: (rows[i]['timestamp'], rows[i].get('id') or 0)):
+            row, alerts = rows[index], batch_alerts[index]
+            
+            # Readings older than the device's alert state are not evaluated
+            if alerts is None:
+                continue
+            
+            device_id = row['device_id']
+            timestamp = row['timestamp']
+            active = set()
+            
+            for alert in alerts:
+                key = (device_id, alert['condition'])
+                active.add(alert['condition'])
+                existing = open_alerts.get(key)
+                
+                if existing is not None:
+                    existing.occurrences = (existing.occurrences or 1) + 1
+                    if existing.last_seen is None or timestamp > existing.last_seen:
+                        existing.last_seen = timestamp
+                    continue
+                
+                # Suppressed conditions are retried on the device's next reading
+                if not self._allow(device_id):
+                    continue
+                
+                created = Alert(
+                    device_id=device_id,
+                    timestamp=timestamp,
+                    last_seen=timestamp,
+                    occurrences=1,
+                    type=alert['type'],
+                    condition=alert['condition'],
+                    message=alert['message'],
+                    severity=alert['severity'],
+                    resolved=False
+                )
+                db.session.add(created)
+                open_alerts[key] = created
+                opened.append(created)
+            
+            # Anything still open that the engine no longer reports has cleared
+            for key in [key for key in open_alerts if key[0] == device_id and key[1] not in active]:
+                if open_alerts[key].last_seen and timestamp < open_alerts[key].last_seen:
+                    continue
+                
+                alert = open_alerts.pop(key)
+                alert.resolved = True
+                alert.resolved_at = timestamp
+                alert.updated_at = datetime.utcnow()
+                resolved.append(alert)
+        
+        # Flush for ids, and snapshot before commit expires the objects
+        db.session.flush()
+        
+        return [alert.to_dict() for alert in opened], [alert.to_dict() for alert in resolved]
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'devices': len(self.buckets),
+                'suppressed': self.suppressed
+            }
@@ -1,23 +1,37 @@
 from flask import Blueprint, request, jsonify, current_app
-from datetime import datetime, timedelta
-from backend.models import SensorData, Alert
+from datetime import datetime
+import math
+import numpy as np
+from backend.models import Alert
 from backend.utils.database import db
-from backend.utils.helpers import get_historical_data, prepare_chart_data
+from backend.utils.helpers import (
+    get_latest_reading, get_recent_readings, get_downsampled_history, get_metric_columns,
+    page_limit, paginate_newest_first
+)
+from backend.utils.rollups import get_rollup_history
+from backend.utils.watermarks import watermark_cached
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
 @analytics_bp.route('/current', methods=['GET'])
+@watermark_cached
 def get_current_data():
     try:
+        device_id = request.args.get('device_id', None)
+        
         # Get latest sensor data
-        latest_data = SensorData.query.order_by(SensorData.timestamp.desc()).first()
+        latest_data = get_latest_reading(device_id)
         
         if not latest_data:
             return jsonify({'error': 'No data available'}), 404
         
-        # Get historical data for charts (last 7 days)
-        historical_data = get_historical_data(7)
-        chart_data = prepare_chart_data(historical_data)
+        # Scope the view to a single device so fields are never mixed
+        device_id = latest_data.device_id
+        
+        # Get historical data for charts (last 7 days), bucketed in SQL
+        points = request.args.get('points', current_app.config['CHART_POINTS'], type=int)
+        points = max(1, min(points, current_app.config['CHART_MAX_POINTS']))
+        chart_data = get_downsampled_history(7, device_id, points)
         
         # Calculate health score
         current_conditions = {
@@ -28,10 +42,11 @@ def get_current_data():
             'potassium': latest_data.potassium
         }
         
-        health_score = current_app.analytics_engine.assess_crop_health(current_conditions)
+        analytics_engine = current_app.components.get('analytics_engine')
+        health_score = analytics_engine.assess_crop_health(current_conditions)
         
         # Get active alerts
-        active_alerts = Alert.query.filter_by(resolved=False).all()
+        active_alerts = Alert.query.filter_by(resolved=False, device_id=device_id).all()
         
         return jsonify({
             'current': latest_data.to_dict(),
@@ -45,10 +60,13 @@ def get_current_data():
         return jsonify({'error': 'Internal server error'}), 500
 
 @analytics_bp.route('/health', methods=['GET'])
+@watermark_cached
 def get_health_score():
     try:
+        device_id = request.args.get('device_id', None)
+        
         # Get latest sensor data
-        latest_data = SensorData.query.order_by(SensorData.timestamp.desc()).first()
+        latest_data = get_latest_reading(device_id)
         
         if not latest_data:
             return jsonify({'error': 'No data available'}), 404
@@ -62,10 +80,12 @@ def get_health_score():
             'potassium': latest_data.potassium
         }
         
-        health_score = current_app.analytics_engine.assess_crop_health(current_conditions)
+        analytics_engine = current_app.components.get('analytics_engine')
+        health_score = analytics_engine.assess_crop_health(current_conditions)
         
         return jsonify({
             'healthScore': health_score,
+            'device_id': latest_data.device_id,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -73,11 +93,101 @@ def get_health_score():
         current_app.logger.error(f'Error calculating health score: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+def device_slices(device_ids):
+    # Rows are ordered by device, so each device is one contiguous slice
+    if not len(device_ids):
+        return []
+    
+    starts = np.concatenate(([0], np.flatnonzero(device_ids[1:] != device_ids[:-1]) + 1))
+    ends = np.append(starts[1:], len(device_ids))
+    
+    return [
+        (device_ids[start], start, end)
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
+
+def series_to_list(values):
+    # NaN (from missing readings) is not valid JSON
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+@analytics_bp.route('/health/series', methods=['GET'])
+def get_health_series():
+    try:
+        days = request.args.get('days', 7, type=int)
+        device_id = request.args.get('device_id', None)
+        crop_type = request.args.get('crop', 'Wheat')
+        
+        columns = get_metric_columns(days, device_id)
+        
+        # Score every reading of every device in one vectorized pass
+        analytics_engine = current_app.components.get('analytics_engine')
+        health = analytics_engine.assess_crop_health_series(columns)
+        predicted_yield = analytics_engine.predict_yield_series(columns, crop_type)
+        
+        devices = {}
+        for device, start, end in device_slices(columns['device_id']):
+            devices[device] = {
+                'timestamps': [t.isoformat() for t in columns['timestamp'][start:end]],
+                'healthScore': series_to_list(health[start:end]),
+                'predictedYield': series_to_list(predicted_yield[start:end])
+            }
+        
+        return jsonify({
+            'devices': devices,
+            'crop': crop_type,
+            'days': days,
+            'count': len(columns['device_id']),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error calculating health series: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@analytics_bp.route('/water-stress/episodes', methods=['GET'])
+def get_water_stress_episodes():
+    try:
+        days = request.args.get('days', current_app.config['SENSOR_RETENTION_DAYS'], type=int)
+        device_id = request.args.get('device_id', None)
+        min_readings = request.args.get('min_readings', None, type=int)
+        
+        columns = get_metric_columns(days, device_id)
+        analytics_engine = current_app.components.get('analytics_engine')
+        
+        # One run-length pass over each device's full moisture history
+        episodes = []
+        for device, start, end in device_slices(columns['device_id']):
+            timestamps = columns['timestamp'][start:end]
+            
+            for episode in analytics_engine.find_water_stress_episodes(
+                columns['moisture'][start:end], timestamps, min_readings
+            ):
+                episode['device_id'] = device
+                episode['start'] = episode['start'].isoformat()
+                episode['end'] = episode['end'].isoformat()
+                episodes.append(episode)
+        
+        return jsonify({
+            'episodes': episodes,
+            'count': len(episodes),
+            'days': days,
+            'device_id': device_id,
+            'threshold': analytics_engine.WATER_STRESS_THRESHOLD,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error finding water stress episodes: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
 @analytics_bp.route('/yield-prediction', methods=['GET'])
+@watermark_cached
 def get_yield_prediction():
     try:
+        device_id = request.args.get('device_id', None)
+        
         # Get latest sensor data
-        latest_data = SensorData.query.order_by(SensorData.timestamp.desc()).first()
+        latest_data = get_latest_reading(device_id)
         
         if not latest_data:
             return jsonify({'error': 'No data available'}), 404
@@ -94,23 +204,25 @@ def get_yield_prediction():
             'potassium': latest_data.potassium
         }
         
-        # Get historical data for moisture
-        historical_data = get_historical_data(7)
-        moisture_data = [d.moisture for d in historical_data]
+        # Only the device's last few readings matter for water stress
+        recent_data = get_recent_readings(latest_data.device_id, 5)
+        moisture_data = [d.moisture for d in recent_data]
         
         # Predict yield
-        predicted_yield = current_app.analytics_engine.predict_yield(
+        analytics_engine = current_app.components.get('analytics_engine')
+        predicted_yield = analytics_engine.predict_yield(
             current_conditions, 
             crop_type
         )
         
         # Check for water stress
-        water_stress = current_app.analytics_engine.detect_water_stress(moisture_data)
+        water_stress = analytics_engine.detect_water_stress(moisture_data)
         
         return jsonify({
             'predictedYield': predicted_yield,
             'crop': crop_type,
             'waterStress': water_stress,
+            'device_id': latest_data.device_id,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -118,19 +230,54 @@ def get_yield_prediction():
         current_app.logger.error(f'Error predicting yield: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@analytics_bp.route('/trends', methods=['GET'])
+def get_trends():
+    try:
+        days = request.args.get('days', 30, type=int)
+        device_id = request.args.get('device_id', None)
+        
+        # Hourly buckets for up to a month, daily beyond that
+        resolution = request.args.get('resolution', 'hour' if days <= 31 else 'day')
+        
+        if resolution not in ('hour', 'day'):
+            return jsonify({'error': 'resolution must be hour or day'}), 400
+        
+        trends = get_rollup_history(days, device_id, resolution)
+        
+        return jsonify({
+            'trends': trends,
+            'days': days,
+            'device_id': device_id,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error retrieving trends: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
 @analytics_bp.route('/alerts', methods=['GET'])
 def get_alerts():
     try:
         resolved = request.args.get('resolved', 'false').lower() == 'true'
-        limit = request.args.get('limit', 50, type=int)
+        limit = page_limit(50)
+        device_id = request.args.get('device_id', None)
+        
+        query = Alert.query.filter_by(resolved=resolved)
+        
+        if device_id:
+            query = query.filter(Alert.device_id == device_id)
         
-        alerts = Alert.query.filter_by(resolved=resolved).order_by(
-            Alert.timestamp.desc()
-        ).limit(limit).all()
+        try:
+            alerts, next_cursor = paginate_newest_first(
+                query, Alert.timestamp, Alert.id, limit, request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'alerts': [alert.to_dict() for alert in alerts],
-            'count': len(alerts)
+            'count': len(alerts),
+            'nextCursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -146,7 +293,9 @@ def resolve_alert(alert_id):
             return jsonify({'error': 'Alert not found'}), 404
         
         alert.resolved = True
+        alert.resolved_at = alert.updated_at = datetime.utcnow()
         db.session.commit()
+        current_app.watermarks.bump(alert.device_id)
         
         return jsonify({
             'message': 'Alert resolved successfully',
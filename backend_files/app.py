@@ -1,57 +1,58 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from datetime import datetime
+import atexit
 import logging
 from backend_files.config import Config
+from backend.utils.database import init_db
+from backend.utils.registry import ComponentRegistry
+from backend.utils.ingest_queue import WriteBehindQueue
+from backend.utils.events import EventBroker
+from backend.utils.watermarks import DataWatermarks, PayloadCache
+from backend.utils.alert_manager import AlertManager
 
 # Import routes
 from routes.sensor_routes import sensor_bp
 from routes.analytics_routes import analytics_bp
 from routes.recommendation_routes import recommendation_bp
+from routes.stream_routes import stream_bp
 
-# Import data processor
+# Import data processor (ML components are imported lazily, see create_app)
 from cloud_processing.data_processor import DataProcessor
-from cloud_processing.crop_recommender import CropRecommender
-from cloud_processing.fertilizer_recommender import FertilizerRecommender
-from cloud_processing.analytics_engine import AnalyticsEngine
+from cloud_processing.alert_engine import StreamingAlertEngine
+from cloud_processing.recommendation_cache import RecommendationCache
+from cloud_processing.model_registry import ModelRegistry, ModelWatcher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
-    app = Flask(__name__)
-    app.config.from_object(Config)
-    
-    # Enable CORS
-    CORS(app)
-    
-    # Initialize components
-    app.data_processor = DataProcessor()
-    app.crop_recommender = CropRecommender('models/crop_recommender_model.pkl')
-    app.fertilizer_recommender = FertilizerRecommender('models/fertilizer_recommender_model.pkl')
-    
-    # Register blueprints
-    app.register_blueprint(sensor_bp)from flask import Flask, jsonify
-from flask_cors import CORS
-from datetime import datetime
-import logging
-from backend_files.config import Config
-
-# Import routes
-from routes.sensor_routes import sensor_bp
-from routes.analytics_routes import analytics_bp
-from routes.recommendation_routes import recommendation_bp
-
-# Import data processor
-from cloud_processing.data_processor import DataProcessor
-from cloud_processing.crop_recommender import CropRecommender
-from cloud_processing.fertilizer_recommender import FertilizerRecommender
-from cloud_processing.analytics_engine import AnalyticsEngine
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+def create_components(model_registry):
+    # Heavy ML libraries are only imported when a component is first used
+    components = ComponentRegistry()
+    
+    def crop_recommender():
+        from cloud_processing.crop_recommender import CropRecommender
+        return model_registry.build_recommender(
+            'crop_recommender', CropRecommender, Config.CROP_MODEL_PATH, Config.MODEL_MMAP_MODE
+        )
+    
+    def fertilizer_recommender():
+        from cloud_processing.fertilizer_recommender import FertilizerRecommender
+        return model_registry.build_recommender(
+            'fertilizer_recommender', FertilizerRecommender,
+            Config.FERTILIZER_MODEL_PATH, Config.MODEL_MMAP_MODE
+        )
+    
+    def analytics_engine():
+        from cloud_processing.analytics_engine import AnalyticsEngine
+        return AnalyticsEngine()
+    
+    components.register('crop_recommender', crop_recommender)
+    components.register('fertilizer_recommender', fertilizer_recommender)
+    components.register('analytics_engine', analytics_engine)
+    
+    return components
 
 def create_app():
     app = Flask(__name__)
@@ -60,18 +61,62 @@ def create_app():
     # Enable CORS
     CORS(app)
     
+    # Initialize database
+    init_db(app)
+    
     # Initialize components
-    app.data_processor = DataProcessor()
-    app.crop_recommender = CropRecommender('models/crop_recommender_model.pkl')
-    app.fertilizer_recommender = FertilizerRecommender('models/fertilizer_recommender_model.pkl')
+    app.data_processor = DataProcessor(
+        capacity=Config.SENSOR_BUFFER_CAPACITY,
+        max_age=Config.SENSOR_BUFFER_MAX_AGE
+    )
+    app.model_registry = ModelRegistry(Config.MODEL_REGISTRY_DIR)
+    app.components = create_components(app.model_registry)
+    
+    # Fail at startup rather than in /ready on a misspelled component name
+    unknown = [name for name in Config.WARMUP_COMPONENTS if name not in app.components.factories]
+    if unknown:
+        raise ValueError(f'Unknown WARMUP_COMPONENTS: {", ".join(unknown)}')
+    app.recommendation_cache = RecommendationCache(
+        maxsize=Config.RECOMMENDATION_CACHE_SIZE,
+        ttl=Config.RECOMMENDATION_CACHE_TTL,
+        quantization=Config.RECOMMENDATION_QUANTIZATION
+    )
+    app.watermarks = DataWatermarks(refresh_interval=Config.WATERMARK_REFRESH_SECONDS)
+    app.payload_cache = PayloadCache(maxsize=Config.RESPONSE_CACHE_SIZE)
+    app.event_broker = EventBroker(
+        app,
+        history_size=Config.STREAM_HISTORY_SIZE,
+        max_subscribers=Config.STREAM_MAX_SUBSCRIBERS,
+        poll_interval=Config.STREAM_POLL_INTERVAL
+    )
     
     # Register blueprints
     app.register_blueprint(sensor_bp)
     app.register_blueprint(analytics_bp)
     app.register_blueprint(recommendation_bp)
-    
-    # Initialize with some historical data
-    app.analytics_engine = AnalyticsEngine(app.data_processor.sensor_data)
+    app.register_blueprint(stream_bp)
+    
+    app.alert_engine = StreamingAlertEngine(
+        window=Config.ALERT_WINDOW,
+        hysteresis=Config.ALERT_HYSTERESIS
+    )
+    app.alert_manager = AlertManager(
+        rate_per_hour=Config.ALERT_RATE_PER_HOUR,
+        burst=Config.ALERT_BURST
+    )
+    
+    # Write-behind ingestion: requests only enqueue, workers persist
+    app.ingest_queue = None
+    if Config.INGEST_MODE == 'queue':
+        app.ingest_queue = WriteBehindQueue(
+            app,
+            maxsize=Config.INGEST_QUEUE_SIZE,
+            batch_size=Config.INGEST_BATCH_SIZE,
+            flush_interval=Config.INGEST_FLUSH_INTERVAL,
+            workers=Config.INGEST_WORKERS
+        )
+        app.ingest_queue.start()
+        atexit.register(app.ingest_queue.stop)
     
     @app.route('/')
     def index():
@@ -81,32 +126,34 @@ def create_app():
             'timestamp': datetime.now().isoformat()
         })
     
-    @app.errorhandler(404)
-    def not_found(error):
-        return jsonify({'error': 'Not found'}), 404
-    
-    @app.errorhandler(500)
-    def internal_error(error):
-        return jsonify({'error': 'Internal server error'}), 500
-    
-    return app
-
-if __name__ == '__main__':
-    app = create_app()
-    app.run(host='0.0.0.0', port=5000, debug=True)
-    app.register_blueprint(analytics_bp)
-    app.register_blueprint(recommendation_bp)
-    
-    # Initialize with some historical data
-    app.analytics_engine = AnalyticsEngine(app.data_processor.sensor_data)
-    
-    @app.route('/')
-    def index():
+    @app.route('/ready')
+    def ready():
+        # 503 until every component scheduled for warmup has loaded
+        components = app.components.status()
+        is_ready = all(
+            components[name]['status'] == 'ready' for name in Config.WARMUP_COMPONENTS
+        )
+        
         return jsonify({
-            'message': 'Smart Agriculture API',
-            'status': 'online',
-            'timestamp': datetime.now().isoformat()
-        })
+            'status': 'ready' if is_ready else 'starting',
+            'components': components
+        }), 200 if is_ready else 503
+    
+    if Config.WARMUP_COMPONENTS:
+        app.components.warmup(Config.WARMUP_COMPONENTS)
+    
+    # Swap in newly published model versions without a restart
+    if Config.MODEL_REGISTRY_POLL_INTERVAL > 0:
+        app.model_watcher = ModelWatcher(
+            app.model_registry,
+            app.components,
+            {
+                'crop_recommender': 'crop_recommender',
+                'fertilizer_recommender': 'fertilizer_recommender'
+            },
+            interval=Config.MODEL_REGISTRY_POLL_INTERVAL
+        )
+        app.model_watcher.start()
     
     @app.errorhandler(404)
     def not_found(error):
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 class Config:
     # Database configuration
@@ -13,4 +14,85 @@ class Config:
     
     # Model paths
     CROP_MODEL_PATH = 'models/crop_recommender_model.pkl'
-    FERTILIZER_MODEL_PATH = 'models/fertilizer_recommender_model.pkl'
\ No newline at end of file
+    FERTILIZER_MODEL_PATH = 'models/fertilizer_recommender_model.pkl'
+    
+    # Read-only memory mapping lets gunicorn workers share model pages;
+    # set MODEL_MMAP_MODE= (empty) to load private copies instead
+    MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r') or None
+    
+    # Versioned model registry; the paths above are used while it is empty
+    MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or 'models/registry'
+    MODEL_REGISTRY_POLL_INTERVAL = int(os.environ.get('MODEL_REGISTRY_POLL_INTERVAL', 30))
+    
+    # Components loaded in a background thread at startup, e.g.
+    # 'crop_recommender,fertilizer_recommender'; by default everything
+    # (and its ML imports) loads on first use
+    WARMUP_COMPONENTS = [
+        name.strip() for name in os.environ.get('WARMUP_COMPONENTS', '').split(',') if name.strip()
+    ]
+    
+    # Sensor ingestion
+    SENSOR_BATCH_MAX_SIZE = int(os.environ.get('SENSOR_BATCH_MAX_SIZE', 5000))
+    # 'sync' stores readings inside the request; 'queue' acknowledges with 202
+    # and leaves persistence to background write-behind workers
+    INGEST_MODE = os.environ.get('INGEST_MODE', 'sync')
+    INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 10000))
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 500))
+    INGEST_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL', 0.5))
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))
+    INGEST_RETRY_AFTER = int(os.environ.get('INGEST_RETRY_AFTER', 5))
+    
+    # In-memory sensor buffer (per device); 2016 readings = 7 days at 5 minutes
+    SENSOR_BUFFER_CAPACITY = int(os.environ.get('SENSOR_BUFFER_CAPACITY', 2016))
+    SENSOR_BUFFER_MAX_AGE = (
+        timedelta(hours=float(os.environ['SENSOR_BUFFER_MAX_AGE_HOURS']))
+        if os.environ.get('SENSOR_BUFFER_MAX_AGE_HOURS') else None
+    )
+    
+    # Streaming alert engine
+    ALERT_WINDOW = int(os.environ.get('ALERT_WINDOW', 5))
+    # Extra margin a value must recover by before an active alert clears
+    # (and is auto-resolved), so readings hovering at a threshold do not flap
+    ALERT_HYSTERESIS = {
+        'water_stress': 5,
+        'low_nitrogen': 5,
+        'low_phosphorus': 3,
+        'low_potassium': 5
+    }
+    # New alert rows per device: sustained rate per hour and burst size
+    ALERT_RATE_PER_HOUR = float(os.environ.get('ALERT_RATE_PER_HOUR', 12))
+    ALERT_BURST = int(os.environ.get('ALERT_BURST', 5))
+    
+    # Conditional GET for analytics endpoints: how often (seconds) the data
+    # watermark is re-read from the database to see other workers' writes
+    WATERMARK_REFRESH_SECONDS = float(os.environ.get('WATERMARK_REFRESH_SECONDS', 5))
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+    
+    # Dashboard charts
+    CHART_POINTS = int(os.environ.get('CHART_POINTS', 200))
+    CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 2000))
+    
+    # Live dashboard stream (Server-Sent Events); each open stream holds a
+    # worker thread, so run under a threaded or gevent server. Events are
+    # logged in the database and tailed every STREAM_POLL_INTERVAL seconds,
+    # so a stream sees writes from every worker process.
+    STREAM_MAX_SUBSCRIBERS = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 100))
+    STREAM_HISTORY_SIZE = int(os.environ.get('STREAM_HISTORY_SIZE', 1000))
+    STREAM_HEARTBEAT_SECONDS = int(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+    STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL', 1))
+    
+    # Retention: raw readings older than this are compacted to Parquet
+    SENSOR_RETENTION_DAYS = int(os.environ.get('SENSOR_RETENTION_DAYS', 90))
+    SENSOR_ARCHIVE_DIR = os.environ.get('SENSOR_ARCHIVE_DIR') or 'archive/sensor_data'
+    
+    # Largest page the listing endpoints return; older rows are reached
+    # through the nextCursor of each page
+    PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', 1000))
+    
+    # Rows fetched per round trip by the streaming export
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+    
+    # Recommendation cache
+    RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 1024))
+    RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 300))
+    RECOMMENDATION_QUANTIZATION = float(os.environ.get('RECOMMENDATION_QUANTIZATION', 0.5))
\ No newline at end of file
@@ -1,4 +1,6 @@
+import click
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 
 db = SQLAlchemy()
 
@@ -6,4 +8,100 @@ def init_db(app):
     db.init_app(app)
     
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        db.create_all()
+    
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Bring an existing database up to the current schema."""
+        upgrade_db()
+        print('Database schema is up to date')
+    
+    @app.cli.command('backfill-rollups')
+    @click.option('--days', type=int, default=None, help='Only rebuild the last N days.')
+    def backfill_rollups_command(days):
+        """Rebuild hourly and daily rollups from raw sensor data."""
+        from backend.utils.rollups import backfill_rollups
+        
+        processed = backfill_rollups(days)
+        print(f'Rolled up {processed} readings')
+    
+    @app.cli.command('compact-sensor-data')
+    @click.option('--days', type=int, default=None, help='Override SENSOR_RETENTION_DAYS.')
+    def compact_sensor_data_command(days):
+        """Move raw readings past the retention window into Parquet files."""
+        from backend.utils.retention import compact_sensor_data
+        
+        max_age_days = days if days is not None else app.config['SENSOR_RETENTION_DAYS']
+        compacted = compact_sensor_data(app.config['SENSOR_ARCHIVE_DIR'], max_age_days)
+        print(f'Compacted {compacted} readings')
+
+OBSOLETE_INDEXES = {
+    'sensor_data': ['ix_sensor_data_device_timestamp', 'ix_sensor_data_timestamp']
+}
+
+def upgrade_db():
+    """Add missing tables, columns and indexes, then backfill derived tables"""
+    # create_all only creates missing tables; it never alters existing ones
+    db.create_all()
+    
+    inspector = inspect(db.engine)
+    
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                default = ''
+                if column.server_default is not None:
+                    default = f' DEFAULT {column.server_default.arg}'
+                
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'
+                ))
+    
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    
+    # Indexes superseded by wider ones that also cover keyset pagination
+    with db.engine.begin() as connection:
+        for table_name, index_names in OBSOLETE_INDEXES.items():
+            existing = {index['name'] for index in inspector.get_indexes(table_name)}
+            for index_name in index_names:
+                if index_name in existing:
+                    connection.execute(text(f'DROP INDEX {index_name}'))
+    
+    backfill_latest_readings()
+
+def backfill_latest_readings():
+    """Populate latest_sensor_reading for devices that have no row yet"""
+    from backend.models import SensorData, LatestSensorReading
+    
+    known = {row.device_id for row in LatestSensorReading.query.all()}
+    device_ids = [row[0] for row in db.session.query(SensorData.device_id).distinct()]
+    
+    for device_id in device_ids:
+        if device_id in known:
+            continue
+        
+        latest = SensorData.query.filter(
+            SensorData.device_id == device_id
+        ).order_by(SensorData.timestamp.desc(), SensorData.id.desc()).first()
+        
+        db.session.add(LatestSensorReading(
+            device_id=device_id,
+            sensor_data_id=latest.id,
+            timestamp=latest.timestamp,
+            moisture=latest.moisture,
+            temperature=latest.temperature,
+            humidity=latest.humidity,
+            nitrogen=latest.nitrogen,
+            phosphorus=latest.phosphorus,
+            potassium=latest.potassium
+        ))
+    
+    db.session.commit()
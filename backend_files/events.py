@@ -0,0 +1,165 @@
+import json
+import logging
+import queue
+import threading
+import time
+from backend.utils.database import db
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, device_id=None, maxsize=100):
+        self.device_id = device_id
+        self.events = queue.Queue(maxsize)
+    
+    def matches(self, event):
+        # Device-less events only reach unfiltered (fleet-wide) streams
+        return self.device_id is None or event['device_id'] == self.device_id
+    
+    def deliver(self, event):
+        # A slow client loses its oldest pending event rather than blocking publishers
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+class EventBroker:
+    PAGE_SIZE = 500
+    PRUNE_INTERVAL = 60
+    
+    def __init__(self, app, history_size=1000, max_subscribers=100, poll_interval=1.0):
+        # Events are rows in stream_events, added in the same transaction as
+        # the change they describe. Each process tails that table from one
+        # background thread and fans new rows out to its own subscribers, so
+        # streams see every worker's writes and event ids (row ids) are the
+        # same in every worker, which keeps Last-Event-ID resumable.
+        self.app = app
+        self.history_size = history_size
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+        self.subscriptions = set()
+        self.cursor = None
+        self.pruned_at = time.monotonic()
+        self.thread = None
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+    
+    def publish(self, event_type, data, device_id=None):
+        """Add an event to the current transaction; it is delivered once committed"""
+        self.publish_many([(event_type, data, device_id)])
+    
+    def publish_many(self, events):
+        from backend.models import StreamEvent
+        
+        if events:
+            db.session.bulk_insert_mappings(StreamEvent, [
+                {'type': event_type, 'data': data, 'device_id': device_id}
+                for event_type, data, device_id in events
+            ])
+    
+    def notify(self):
+        """Poll right away after a local commit instead of waiting for the interval"""
+        self.wake.set()
+    
+    def _start(self):
+        from backend.models import StreamEvent
+        
+        # New streams start at the current end of the log
+        self.cursor = db.session.query(db.func.max(StreamEvent.id)).scalar() or 0
+        self.thread = threading.Thread(target=self._run, name='event-poller', daemon=True)
+        self.thread.start()
+    
+    def _fetch(self, after, until=None, limit=PAGE_SIZE):
+        from backend.models import StreamEvent
+        
+        query = StreamEvent.query.filter(StreamEvent.id > after)
+        if until is not None:
+            query = query.filter(StreamEvent.id <= until)
+        
+        return [row.to_event() for row in query.order_by(StreamEvent.id).limit(limit)]
+    
+    def _poll(self):
+        from backend.models import StreamEvent
+        
+        events = self._fetch(self.cursor)
+        
+        with self.lock:
+            for event in events:
+                for subscription in self.subscriptions:
+                    if subscription.matches(event):
+                        subscription.deliver(event)
+                self.cursor = event['id']
+        
+        # Keep only the resumable tail of the log
+        if time.monotonic() - self.pruned_at >= self.PRUNE_INTERVAL:
+            StreamEvent.query.filter(
+                StreamEvent.id <= self.cursor - self.history_size
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            self.pruned_at = time.monotonic()
+        
+        # A full page means more rows are already waiting
+        return len(events) == self.PAGE_SIZE
+    
+    def _run(self):
+        while True:
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            
+            try:
+                with self.app.app_context():
+                    while self._poll():
+                        pass
+            except Exception as e:
+                logger.error(f'Polling stream events failed: {str(e)}')
+    
+    def subscribe(self, device_id=None, last_event_id=None):
+        subscription = Subscription(device_id)
+        
+        with self.lock:
+            if len(self.subscriptions) >= self.max_subscribers:
+                return None
+            
+            if self.thread is None:
+                self._start()
+            
+            # Replay the gap up to the poller's position while holding the
+            # lock, so replayed and live events arrive in id order
+            if last_event_id is not None:
+                after = max(last_event_id, self.cursor - self.history_size)
+                for event in self._fetch(after, self.cursor, self.history_size):
+                    if subscription.matches(event):
+                        subscription.deliver(event)
+            
+            self.subscriptions.add(subscription)
+        
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'subscribers': len(self.subscriptions),
+                'maxSubscribers': self.max_subscribers,
+                'cursor': self.cursor,
+                'pollInterval': self.poll_interval
+            }
+
+def format_sse(data, event_type=None, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event_type:
+        lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    
+    return '\n'.join(lines) + '\n\n'
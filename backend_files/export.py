@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from backend.models import SensorData
+from backend.utils.database import db
+
+EXPORT_COLUMNS = [
+    'id', 'device_id', 'timestamp', 'moisture', 'temperature', 'humidity',
+    'nitrogen', 'phosphorus', 'potassium'
+]
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+def export_query(start=None, end=None, device_id=None):
+    """Column-tuple query over sensor_data in (timestamp, id) order"""
+    query = db.session.query(*(getattr(SensorData, column) for column in EXPORT_COLUMNS))
+    
+    if start:
+        query = query.filter(SensorData.timestamp >= start)
+    if end:
+        query = query.filter(SensorData.timestamp < end)
+    if device_id:
+        query = query.filter(SensorData.device_id == device_id)
+    
+    return query.order_by(SensorData.timestamp, SensorData.id)
+
+def iter_chunks(query, chunk_size=5000):
+    # yield_per streams rows through a server-side cursor where the driver
+    # supports one, so only a chunk of rows is ever held at once
+    chunk = []
+    for row in query.yield_per(chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    
+    if chunk:
+        yield chunk
+
+def _row_dict(row):
+    data = dict(zip(EXPORT_COLUMNS, row))
+    data['timestamp'] = data['timestamp'].isoformat()
+    return data
+
+def write_ndjson(chunks):
+    for chunk in chunks:
+        yield ''.join(json.dumps(_row_dict(row)) + '\n' for row in chunk)
+
+def write_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    
+    for chunk in chunks:
+        writer.writerows(
+            (row[0], row[1], row[2].isoformat(), *row[3:]) for row in chunk
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands written bytes back to the generator
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+def write_parquet(chunks):
+    from backend.utils.retention import _load_pyarrow, _archive_schema
+    
+    pa, pq = _load_pyarrow()
+    schema = _archive_schema(pa)
+    sink = _ChunkSink()
+    
+    # Same schema as the archive tier; one row group per chunk
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    
+    yield sink.drain()
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+    'parquet': write_parquet
+}
@@ -1,40 +1,232 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import base64
+import binascii
 import json
+import math
+
+CHART_METRICS = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
 
 def serialize_datetime(obj):
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError("Type not serializable")
 
-def get_historical_data(days=7):
+def encode_cursor(timestamp, row_id):
+    """Opaque keyset-pagination cursor for the row at (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (timestamp, id) from encode_cursor, or raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+def after_cursor(query, timestamp_column, id_column, cursor, descending=False):
+    """Restrict a (timestamp, id)-ordered query to rows past `cursor`"""
+    from sqlalchemy import or_, and_
+    
+    timestamp, row_id = decode_cursor(cursor)
+    
+    if descending:
+        return query.filter(or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id)
+        ))
+    
+    return query.filter(or_(
+        timestamp_column > timestamp,
+        and_(timestamp_column == timestamp, id_column > row_id)
+    ))
+
+def page_limit(default):
+    """The request's page size, clamped to PAGE_MAX_LIMIT"""
+    from flask import current_app, request
+    
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, current_app.config['PAGE_MAX_LIMIT']))
+
+def paginate_newest_first(query, timestamp_column, id_column, limit, cursor=None):
+    """Return (rows, next_cursor) for one page, newest first"""
+    # Keyed on (timestamp, id) rather than an offset: every page is an index
+    # range scan, and rows inserted meanwhile never shift later pages
+    if cursor:
+        query = after_cursor(query, timestamp_column, id_column, cursor, descending=True)
+    
+    # One extra row tells whether another page exists
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+def get_latest_reading(device_id=None):
+    """Get the most recent reading, optionally for a single device"""
+    from backend.models import LatestSensorReading
+    
+    # latest_sensor_reading holds one row per device, so both paths are cheap
+    if device_id:
+        return LatestSensorReading.query.get(device_id)
+    
+    return LatestSensorReading.query.order_by(LatestSensorReading.timestamp.desc()).first()
+
+def get_recent_readings(device_id, count):
+    """Get the last `count` readings of a device, oldest first"""
+    from backend.models import SensorData
+    
+    data = SensorData.query.filter(
+        SensorData.device_id == device_id
+    ).order_by(SensorData.timestamp.desc()).limit(count).all()
+    
+    return list(reversed(data))
+
+def get_historical_data(days=7, device_id=None):
     """Get historical data for the specified number of days"""
     from backend.models import SensorData
     from backend.utils.database import db
     
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    now = datetime.utcnow()
+    cutoff_date = now - timedelta(days=days)
     
-    data = SensorData.query.filter(
-        SensorData.timestamp >= cutoff_date
-    ).order_by(SensorData.timestamp.asc()).all()
+    query = SensorData.query.filter(SensorData.timestamp >= cutoff_date)
+    
+    if device_id:
+        query = query.filter(SensorData.device_id == device_id)
+    
+    data = query.order_by(SensorData.timestamp.asc()).all()
+    
+    # Readings past the retention window live in the Parquet archive
+    data = merge_archived_data(data, cutoff_date, device_id, now)
     
     return data
 
-def prepare_chart_data(sensor_data):
-    """Prepare data for charts"""
-    timestamps = [d.timestamp for d in sensor_data]
-    moisture = [d.moisture for d in sensor_data]
-    temperature = [d.temperature for d in sensor_data]
-    humidity = [d.humidity for d in sensor_data]
-    nitrogen = [d.nitrogen for d in sensor_data]
-    phosphorus = [d.phosphorus for d in sensor_data]
-    potassium = [d.potassium for d in sensor_data]
-    
-    return {
-        'timestamps': timestamps,
-        'moisture': moisture,
-        'temperature': temperature,
-        'humidity': humidity,
-        'nitrogen': nitrogen,
-        'phosphorus': phosphorus,
-        'potassium': potassium
-    }
\ No newline at end of file
+def get_metric_columns(days=7, device_id=None):
+    """Readings of the last `days` as NumPy columns, ordered by device then time"""
+    import numpy as np
+    from flask import current_app
+    from backend.models import SensorData
+    from backend.utils.database import db
+    
+    # One clock reading, so days == SENSOR_RETENTION_DAYS stays on the hot path
+    now = datetime.utcnow()
+    cutoff_date = now - timedelta(days=days)
+    retention_cutoff = now - timedelta(days=current_app.config['SENSOR_RETENTION_DAYS'])
+    
+    if cutoff_date < retention_cutoff:
+        # Part of the range is archived; fall back to the merged row path
+        rows = sorted(
+            (
+                (d.device_id, d.timestamp, *(getattr(d, metric) for metric in CHART_METRICS))
+                for d in get_historical_data(days, device_id)
+            ),
+            key=lambda row: (row[0], row[1])
+        )
+    else:
+        # Plain column tuples skip building an ORM object per reading
+        query = db.session.query(
+            SensorData.device_id,
+            SensorData.timestamp,
+            *(getattr(SensorData, metric) for metric in CHART_METRICS)
+        ).filter(SensorData.timestamp >= cutoff_date)
+        
+        if device_id:
+            query = query.filter(SensorData.device_id == device_id)
+        
+        rows = query.order_by(SensorData.device_id, SensorData.timestamp).all()
+    
+    values = list(zip(*rows)) or [()] * (2 + len(CHART_METRICS))
+    
+    columns = {
+        'device_id': np.asarray(values[0], dtype=object),
+        'timestamp': np.asarray(values[1], dtype=object)
+    }
+    for i, metric in enumerate(CHART_METRICS):
+        # Missing values become NaN and propagate through the scores
+        columns[metric] = np.asarray(values[2 + i], dtype=np.float64)
+    
+    return columns
+
+def merge_archived_data(data, cutoff_date, device_id=None, now=None):
+    """Add archived readings newer than cutoff_date to hot-table results"""
+    from flask import current_app
+    from backend.utils.retention import read_archived_data, merge_tiers
+    
+    # `now` must be the clock reading cutoff_date was derived from
+    now = now or datetime.utcnow()
+    retention_cutoff = now - timedelta(days=current_app.config['SENSOR_RETENTION_DAYS'])
+    
+    if cutoff_date >= retention_cutoff:
+        return data
+    
+    archived = read_archived_data(
+        current_app.config['SENSOR_ARCHIVE_DIR'], cutoff_date, device_id=device_id
+    )
+    
+    return merge_tiers(archived, data) if archived else data
+
+def epoch_seconds(column):
+    """SQL expression for a timestamp column as integer seconds since the epoch"""
+    from sqlalchemy import func, cast, Integer
+    from backend.utils.database import db
+    
+    dialect = db.engine.dialect.name
+    
+    if dialect == 'postgresql':
+        return cast(func.extract('epoch', column), Integer)
+    if dialect in ('mysql', 'mariadb'):
+        return cast(func.unix_timestamp(column), Integer)
+    
+    return cast(func.strftime('%s', column), Integer)
+
+def get_downsampled_history(days=7, device_id=None, points=200):
+    """Aggregate history into at most `points` fixed time buckets in SQL"""
+    from sqlalchemy import func
+    from backend.models import SensorData
+    from backend.utils.database import db
+    
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    start = int(cutoff_date.replace(tzinfo=timezone.utc).timestamp())
+    bucket_seconds = max(1, math.ceil(days * 86400 / max(1, points)))
+    
+    # Offset of the bucket start from the cutoff; modulo keeps this integer
+    # arithmetic on every backend
+    offset = epoch_seconds(SensorData.timestamp) - start
+    bucket = (offset - offset % bucket_seconds).label('bucket')
+    
+    columns = [bucket, func.count(SensorData.id)]
+    for metric in CHART_METRICS:
+        column = getattr(SensorData, metric)
+        columns.extend([func.min(column), func.avg(column), func.max(column)])
+    
+    query = db.session.query(*columns).filter(SensorData.timestamp >= cutoff_date)
+    
+    if device_id:
+        query = query.filter(SensorData.device_id == device_id)
+    
+    rows = query.group_by(bucket).order_by(bucket).all()
+    
+    chart_data = {
+        'timestamps': [
+            datetime.utcfromtimestamp(start + row[0]).isoformat() for row in rows
+        ],
+        'counts': [row[1] for row in rows],
+        'bucketSeconds': bucket_seconds,
+        'min': {},
+        'max': {}
+    }
+    
+    for i, metric in enumerate(CHART_METRICS):
+        position = 2 + i * 3
+        chart_data['min'][metric] = [row[position] for row in rows]
+        chart_data[metric] = [
+            round(float(row[position + 1]), 2) if row[position + 1] is not None else None
+            for row in rows
+        ]
+        chart_data['max'][metric] = [row[position + 2] for row in rows]
+    
+    return chart_data
\ No newline at end of file
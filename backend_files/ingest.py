@@ -0,0 +1,225 @@
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import or_
+from backend.models import SensorData, LatestSensorReading
+from backend.utils.database import db
+from backend.utils.rollups import update_rollups
+
+REQUIRED_FIELDS = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 timestamp into a naive UTC datetime"""
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return timestamp
+
+def validate_reading(data):
+    """Return an error message if the reading is invalid, otherwise None"""
+    if not isinstance(data, dict):
+        return 'Reading must be a JSON object'
+    
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return f'Missing field: {field}'
+        
+        value = data[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f'Invalid value for field: {field}'
+    
+    if data.get('timestamp') is not None:
+        try:
+            parse_timestamp(data['timestamp'])
+        except (TypeError, ValueError, AttributeError):
+            return 'Invalid value for field: timestamp'
+    
+    return None
+
+def seed_alert_engine(device_ids):
+    """(Re)load recent readings for devices whose alert state is missing or behind"""
+    alert_engine = current_app.alert_engine
+    
+    stored = {
+        latest.device_id: (latest.timestamp, latest.sensor_data_id or 0)
+        for latest in LatestSensorReading.query.filter(
+            LatestSensorReading.device_id.in_(list(device_ids))
+        )
+    }
+    
+    for device_id in device_ids:
+        # Other workers ingest for the same devices; once the stored latest
+        # reading is ahead of what this worker evaluated, replay from the database
+        current = alert_engine.last_key(device_id)
+        if current is not None and (device_id not in stored or stored[device_id] <= current):
+            continue
+        
+        recent = SensorData.query.filter(
+            SensorData.device_id == device_id
+        ).order_by(SensorData.timestamp.desc(), SensorData.id.desc()).limit(alert_engine.window).all()
+        
+        alert_engine.seed(device_id, [d.to_dict() for d in reversed(recent)])
+
+def _latest_upsert_statement(dialect):
+    # INSERT ... ON CONFLICT DO UPDATE ... WHERE: concurrent workers neither
+    # race on a new device nor let an older reading overwrite a newer one
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    table = LatestSensorReading.__table__
+    statement = insert(table)
+    excluded = statement.excluded
+    
+    return statement.on_conflict_do_update(
+        index_elements=['device_id'],
+        set_={
+            column: excluded[column]
+            for column in ['sensor_data_id', 'timestamp'] + REQUIRED_FIELDS
+        },
+        where=or_(table.c.timestamp.is_(None), excluded.timestamp >= table.c.timestamp)
+    )
+
+def update_latest_readings(rows):
+    """Upsert the per-device latest reading table from freshly inserted rows"""
+    newest = {}
+    for row in rows:
+        current = newest.get(row['device_id'])
+        if current is None or row['timestamp'] >= current['timestamp']:
+            newest[row['device_id']] = row
+    
+    dialect = db.engine.dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        db.session.execute(_latest_upsert_statement(dialect), [
+            {
+                'device_id': device_id,
+                'sensor_data_id': row.get('id'),
+                'timestamp': row['timestamp'],
+                **{field: row[field] for field in REQUIRED_FIELDS}
+            }
+            for device_id, row in newest.items()
+        ])
+        return
+    
+    # Portable fallback for backends without ON CONFLICT
+    existing = {
+        latest.device_id: latest
+        for latest in LatestSensorReading.query.filter(
+            LatestSensorReading.device_id.in_(list(newest))
+        )
+    }
+    
+    for device_id, row in newest.items():
+        latest = existing.get(device_id)
+        
+        if latest is None:
+            latest = LatestSensorReading(device_id=device_id)
+            db.session.add(latest)
+        elif latest.timestamp and latest.timestamp > row['timestamp']:
+            # Late (buffered) uploads never replace a newer reading
+            continue
+        
+        latest.sensor_data_id = row.get('id')
+        for field in ['timestamp'] + REQUIRED_FIELDS:
+            setattr(latest, field, row[field])
+
+def publish_readings(rows, readings, opened, resolved):
+    """Log readings and alert changes for live dashboard streams, in the ingest transaction"""
+    broker = current_app.event_broker
+    
+    # One vectorized pass scores the whole batch
+    analytics_engine = current_app.components.get('analytics_engine')
+    health_scores = analytics_engine.assess_crop_health_series({
+        field: [row[field] for row in rows] for field in REQUIRED_FIELDS
+    })
+    
+    events = [
+        (
+            'reading',
+            dict(data, id=row.get('id'), device_id=row['device_id'], healthScore=health_score),
+            row['device_id']
+        )
+        for row, data, health_score in zip(rows, readings, health_scores.tolist())
+    ]
+    
+    # Ongoing alerts are already on the dashboard; only changes are pushed
+    events.extend(('alert', alert, alert['device_id']) for alert in opened)
+    events.extend(('alert_resolved', alert, alert['device_id']) for alert in resolved)
+    
+    broker.publish_many(events)
+
+def store_sensor_readings(readings):
+    """Persist validated readings and their alerts in a single transaction"""
+    now = datetime.utcnow()
+    
+    rows = []
+    for data in readings:
+        timestamp = parse_timestamp(data['timestamp']) if data.get('timestamp') else now
+        data['timestamp'] = timestamp.isoformat()
+        rows.append({
+            'device_id': data.get('device_id', 'unknown'),
+            'timestamp': timestamp,
+            'moisture': data['moisture'],
+            'temperature': data['temperature'],
+            'humidity': data['humidity'],
+            'nitrogen': data['nitrogen'],
+            'phosphorus': data['phosphorus'],
+            'potassium': data['potassium']
+        })
+    
+    device_ids = {row['device_id'] for row in rows}
+    alert_state = {}
+    
+    try:
+        # Rebuild alert state for devices this worker has not seen yet
+        seed_alert_engine(device_ids)
+        alert_state = current_app.alert_engine.snapshot(device_ids)
+        
+        # One bulk insert for all readings; return_defaults fills in the ids
+        db.session.bulk_insert_mappings(SensorData, rows, return_defaults=True)
+        update_latest_readings(rows)
+        update_rollups(rows)
+        
+        # Evaluate alerts incrementally against per-device state
+        batch_alerts = current_app.alert_engine.update_batch(rows)
+        
+        # One open row per device and condition instead of one per reading
+        opened, resolved = current_app.alert_manager.apply(rows, batch_alerts)
+        publish_readings(rows, readings, opened, resolved)
+        
+        db.session.commit()
+    except Exception:
+        # A retried batch must not count its readings twice
+        db.session.rollback()
+        current_app.alert_engine.restore(alert_state)
+        raise
+    
+    # The readings are stored from here on: a failing side effect is logged,
+    # never raised, so callers (and write-behind retries) cannot store them twice
+    processed = readings
+    try:
+        # The in-memory buffer only sees committed readings
+        processed = current_app.data_processor.process_batch(readings)
+    except Exception as e:
+        current_app.logger.error(f'Error buffering stored readings: {str(e)}')
+    
+    try:
+        # Moves the ETag of cached analytics responses for these devices
+        current_app.watermarks.advance(rows)
+        for device_id in {alert['device_id'] for alert in opened + resolved}:
+            current_app.watermarks.bump(device_id)
+        current_app.event_broker.notify()
+    except Exception as e:
+        current_app.logger.error(f'Error announcing stored readings: {str(e)}')
+    
+    return [
+        {
+            'id': row.get('id'),
+            'data': data,
+            'alerts': alerts or []
+        }
+        for row, data, alerts in zip(rows, processed, batch_alerts)
+    ]
@@ -0,0 +1,133 @@
+from datetime import datetime
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class QueueFull(Exception):
+    """Raised when a submission does not fit in the write-behind queue"""
+
+class WriteBehindQueue:
+    def __init__(self, app, maxsize=10000, batch_size=500, flush_interval=0.5,
+                 workers=1, max_retries=3):
+        # Readings are acknowledged on enqueue and persisted by background
+        # workers in micro-batches. Each device always maps to the same
+        # worker so its readings reach the alert engine in order.
+        self.app = app
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.queues = [queue.Queue() for _ in range(max(1, workers))]
+        self.threads = []
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        
+        self.pending = 0
+        self.last_sequence = 0
+        self.committed_sequence = 0
+        self.stored = 0
+        self.dropped = 0
+    
+    def submit(self, readings):
+        """Queue validated readings; returns their sequence numbers"""
+        received_at = datetime.utcnow().isoformat()
+        
+        with self.lock:
+            # All or nothing, so a batch is never half-accepted
+            if self.pending + len(readings) > self.maxsize:
+                raise QueueFull()
+            
+            sequences = []
+            for reading in readings:
+                # Stamp with the receive time, not the time the worker writes it
+                if not reading.get('timestamp'):
+                    reading['timestamp'] = received_at
+                
+                sequence = next(self.sequence)
+                shard = hash(reading.get('device_id', 'unknown')) % len(self.queues)
+                self.queues[shard].put((sequence, reading))
+                sequences.append(sequence)
+            
+            self.pending += len(readings)
+            self.last_sequence = sequences[-1] if sequences else self.last_sequence
+        
+        return sequences
+    
+    def _next_batch(self, items):
+        try:
+            first = items.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(items.get_nowait())
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _store(self, batch):
+        from backend.utils.ingest import store_sensor_readings
+        
+        readings = [reading for _, reading in batch]
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.app.app_context():
+                    store_sensor_readings(readings)
+                return True
+            except Exception as e:
+                logger.error(f'Write-behind flush of {len(readings)} readings failed: {str(e)}')
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt, 30))
+        
+        return False
+    
+    def _run(self, items):
+        while not (self.stopped.is_set() and items.empty()):
+            batch = self._next_batch(items)
+            if not batch:
+                continue
+            
+            stored = self._store(batch)
+            
+            with self.lock:
+                self.pending -= len(batch)
+                if stored:
+                    self.stored += len(batch)
+                    self.committed_sequence = max(self.committed_sequence, batch[-1][0])
+                else:
+                    self.dropped += len(batch)
+    
+    def start(self):
+        for index, items in enumerate(self.queues):
+            thread = threading.Thread(
+                target=self._run, args=(items,), name=f'ingest-writer-{index}', daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+    
+    def stop(self, timeout=30):
+        # Workers finish draining their queues before exiting
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join(timeout)
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'capacity': self.maxsize,
+                'workers': len(self.queues),
+                'lastSequence': self.last_sequence,
+                'committedSequence': self.committed_sequence,
+                'stored': self.stored,
+                'dropped': self.dropped
+            }
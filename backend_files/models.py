@@ -3,6 +3,11 @@ from backend.utils.database import db
 
 class SensorData(db.Model):
     __tablename__ = 'sensor_data'
+    __table_args__ = (
+        # (timestamp, id) keys back keyset pagination and stable export order
+        db.Index('ix_sensor_data_device_timestamp_id', 'device_id', 'timestamp', 'id'),
+        db.Index('ix_sensor_data_timestamp_id', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.String(50), nullable=False)
@@ -27,30 +32,143 @@ class SensorData(db.Model):
             'potassium': self.potassium
         }
 
+class LatestSensorReading(db.Model):
+    # One row per device, kept current at ingest so "latest" is a key lookup
+    __tablename__ = 'latest_sensor_reading'
+    
+    device_id = db.Column(db.String(50), primary_key=True)
+    sensor_data_id = db.Column(db.Integer)
+    timestamp = db.Column(db.DateTime, index=True)
+    moisture = db.Column(db.Float)
+    temperature = db.Column(db.Float)
+    humidity = db.Column(db.Float)
+    nitrogen = db.Column(db.Integer)
+    phosphorus = db.Column(db.Integer)
+    potassium = db.Column(db.Integer)
+    
+    def to_dict(self):
+        return {
+            'id': self.sensor_data_id,
+            'device_id': self.device_id,
+            'timestamp': self.timestamp.isoformat(),
+            'moisture': self.moisture,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'nitrogen': self.nitrogen,
+            'phosphorus': self.phosphorus,
+            'potassium': self.potassium
+        }
+
+class SensorRollup(db.Model):
+    # Hourly/daily aggregates per device, maintained incrementally at ingest
+    __tablename__ = 'sensor_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'resolution', 'bucket_start', name='uq_sensor_rollups_bucket'),
+        db.Index('ix_sensor_rollups_resolution_bucket', 'resolution', 'bucket_start'),
+    )
+    
+    METRICS = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, default=0)
+    last_timestamp = db.Column(db.DateTime)
+    moisture_sum = db.Column(db.Float)
+    moisture_min = db.Column(db.Float)
+    moisture_max = db.Column(db.Float)
+    moisture_last = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float)
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    temperature_last = db.Column(db.Float)
+    humidity_sum = db.Column(db.Float)
+    humidity_min = db.Column(db.Float)
+    humidity_max = db.Column(db.Float)
+    humidity_last = db.Column(db.Float)
+    nitrogen_sum = db.Column(db.Float)
+    nitrogen_min = db.Column(db.Float)
+    nitrogen_max = db.Column(db.Float)
+    nitrogen_last = db.Column(db.Float)
+    phosphorus_sum = db.Column(db.Float)
+    phosphorus_min = db.Column(db.Float)
+    phosphorus_max = db.Column(db.Float)
+    phosphorus_last = db.Column(db.Float)
+    potassium_sum = db.Column(db.Float)
+    potassium_min = db.Column(db.Float)
+    potassium_max = db.Column(db.Float)
+    potassium_last = db.Column(db.Float)
+    
+    def to_dict(self):
+        data = {
+            'device_id': self.device_id,
+            'resolution': self.resolution,
+            'bucket_start': self.bucket_start.isoformat(),
+            'count': self.count
+        }
+        
+        for metric in self.METRICS:
+            total = getattr(self, f'{metric}_sum')
+            data[metric] = {
+                'sum': total,
+                'min': getattr(self, f'{metric}_min'),
+                'max': getattr(self, f'{metric}_max'),
+                'last': getattr(self, f'{metric}_last'),
+                'mean': round(total / self.count, 2) if self.count else None
+            }
+        
+        return data
+
 class Alert(db.Model):
     __tablename__ = 'alerts'
+    __table_args__ = (
+        db.Index('ix_alerts_resolved_timestamp_id', 'resolved', 'timestamp', 'id'),
+        db.Index('ix_alerts_device_resolved_timestamp_id', 'device_id', 'resolved', 'timestamp', 'id'),
+        db.Index('ix_alerts_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     type = db.Column(db.String(50))
+    # Engine condition (e.g. 'low_nitrogen'); one open alert per device and condition
+    condition = db.Column(db.String(50))
     message = db.Column(db.String(200))
     severity = db.Column(db.String(20))
     resolved = db.Column(db.Boolean, default=False)
+    last_seen = db.Column(db.DateTime)
+    occurrences = db.Column(db.Integer, default=1, server_default='1')
+    resolved_at = db.Column(db.DateTime)
+    # Set when the alert opens or resolves; drives cache validators in every worker
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
+            'device_id': self.device_id,
             'timestamp': self.timestamp.isoformat(),
             'type': self.type,
+            'condition': self.condition,
             'message': self.message,
             'severity': self.severity,
-            'resolved': self.resolved
+            'resolved': self.resolved,
+            'lastSeen': (self.last_seen or self.timestamp).isoformat(),
+            'occurrences': self.occurrences or 1,
+            'resolvedAt': self.resolved_at.isoformat() if self.resolved_at else None
         }
 
 class Recommendation(db.Model):
     __tablename__ = 'recommendations'
+    __table_args__ = (
+        db.Index('ix_recommendations_device_timestamp_id', 'device_id', 'timestamp', 'id'),
+        db.Index('ix_recommendations_type_timestamp_id', 'recommendation_type', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50))
+    # Reading the recommendation was made from; pairs features with labels for training
+    sensor_data_id = db.Column(db.Integer, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     recommendation_type = db.Column(db.String(50))
     data = db.Column(db.JSON)
@@ -58,7 +176,27 @@ class Recommendation(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'device_id': self.device_id,
+            'sensor_data_id': self.sensor_data_id,
             'timestamp': self.timestamp.isoformat(),
             'recommendation_type': self.recommendation_type,
             'data': self.data
-        }
\ No newline at end of file
+        }
+class StreamEvent(db.Model):
+    # Dashboard push log: written in the same transaction as the change it
+    # describes and tailed by every worker, so streams see all workers' writes
+    __tablename__ = 'stream_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50))
+    type = db.Column(db.String(30))
+    data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_event(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'device_id': self.device_id,
+            'data': self.data
+        }
@@ -1,15 +1,61 @@
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
-from backend.models import Recommendation, SensorData
+from backend.models import Recommendation, LatestSensorReading
 from backend.utils.database import db
+from backend.utils.helpers import get_latest_reading, page_limit, paginate_newest_first
+from backend.utils.ingest import REQUIRED_FIELDS, validate_reading
 
 recommendation_bp = Blueprint('recommendation', __name__, url_prefix='/api/recommendations')
 
+def publish_recommendation(rec_type, device_id, field, value):
+    # Logged in the caller's transaction; streams receive it once committed
+    current_app.event_broker.publish(
+        'recommendation', {'type': rec_type, field: value, 'device_id': device_id}, device_id
+    )
+
+def record_if_changed(rec_type, device_id, field, value, sensor_data_id=None):
+    """Add a history row (uncommitted) only when the result differs from the last one stored"""
+    def load_previous():
+        previous = Recommendation.query.filter_by(
+            recommendation_type=rec_type, device_id=device_id
+        ).order_by(Recommendation.timestamp.desc()).first()
+        return previous.data.get(field) if previous and previous.data else None
+    
+    if not current_app.recommendation_cache.result_changed((rec_type, device_id), value, load_previous):
+        return False
+    
+    db.session.add(Recommendation(
+        device_id=device_id,
+        sensor_data_id=sensor_data_id,
+        recommendation_type=rec_type,
+        data={
+            field: value,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    ))
+    
+    # Live dashboards only hear about recommendations that changed
+    publish_recommendation(rec_type, device_id, field, value)
+    
+    return True
+
+def store_if_changed(rec_type, device_id, field, value, sensor_data_id=None):
+    """Write a history row only when the result differs from the last one stored"""
+    if not record_if_changed(rec_type, device_id, field, value, sensor_data_id):
+        return False
+    
+    db.session.commit()
+    current_app.event_broker.notify()
+    
+    return True
+
 @recommendation_bp.route('/crops', methods=['GET'])
 def get_crop_recommendations():
     try:
+        device_id = request.args.get('device_id', None)
+        
         # Get latest sensor data
-        latest_data = SensorData.query.order_by(SensorData.timestamp.desc()).first()
+        latest_data = get_latest_reading(device_id)
         
         if not latest_data:
             return jsonify({'error': 'No data available'}), 404
@@ -24,23 +70,26 @@ def get_crop_recommendations():
             latest_data.potassium
         ]]
         
-        # Get crop recommendations
-        recommendations = current_app.crop_recommender.recommend_crop(features)
+        # Reuse the cached result while the quantized reading is unchanged
+        recommender = current_app.components.get('crop_recommender')
+        cache = current_app.recommendation_cache
+        cache_key = cache.make_key('crop', recommender.model_version, features[0])
         
-        # Store recommendation in database
-        recommendation = Recommendation(
-            recommendation_type='crop',
-            data={
-                'recommendations': recommendations,
-                'timestamp': datetime.utcnow().isoformat()
-            }
-        )
+        recommendations = cache.get(cache_key)
+        if recommendations is None:
+            recommendations = recommender.recommend_crop(features)
+            cache.put(cache_key, recommendations)
         
-        db.session.add(recommendation)
-        db.session.commit()
+        # Store recommendation in database only when it changed
+        store_if_changed(
+            'crop', latest_data.device_id, 'recommendations', recommendations,
+            latest_data.sensor_data_id
+        )
         
         return jsonify({
             'recommendations': recommendations,
+            'device_id': latest_data.device_id,
+            'modelVersion': recommender.model_version,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -51,8 +100,10 @@ def get_crop_recommendations():
 @recommendation_bp.route('/fertilizer', methods=['GET'])
 def get_fertilizer_recommendations():
     try:
+        device_id = request.args.get('device_id', None)
+        
         # Get latest sensor data
-        latest_data = SensorData.query.order_by(SensorData.timestamp.desc()).first()
+        latest_data = get_latest_reading(device_id)
         
         if not latest_data:
             return jsonify({'error': 'No data available'}), 404
@@ -70,25 +121,26 @@ def get_fertilizer_recommendations():
             latest_data.potassium
         ]]
         
-        # Get fertilizer recommendations
-        recommendation = current_app.fertilizer_recommender.recommend_fertilizer(
-            features, crop_type
-        )
+        # Reuse the cached result while the quantized reading is unchanged
+        recommender = current_app.components.get('fertilizer_recommender')
+        cache = current_app.recommendation_cache
+        cache_key = cache.make_key('fertilizer', recommender.model_version, features[0], crop_type)
         
-        # Store recommendation in database
-        recommendation_record = Recommendation(
-            recommendation_type='fertilizer',
-            data={
-                'recommendation': recommendation,
-                'timestamp': datetime.utcnow().isoformat()
-            }
-        )
+        recommendation = cache.get(cache_key)
+        if recommendation is None:
+            recommendation = recommender.recommend_fertilizer(features, crop_type)
+            cache.put(cache_key, recommendation)
         
-        db.session.add(recommendation_record)
-        db.session.commit()
+        # Store recommendation in database only when it changed
+        store_if_changed(
+            'fertilizer', latest_data.device_id, 'recommendation', recommendation,
+            latest_data.sensor_data_id
+        )
         
         return jsonify({
             'recommendation': recommendation,
+            'device_id': latest_data.device_id,
+            'modelVersion': recommender.model_version,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -96,24 +148,225 @@ def get_fertilizer_recommendations():
         current_app.logger.error(f'Error generating fertilizer recommendations: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+def load_batch_inputs(payload):
+    """Return (device_ids, sensor_data_ids, feature rows, error) for a batch request"""
+    readings = payload.get('readings')
+    
+    if readings is not None:
+        if not isinstance(readings, list):
+            return None, None, None, 'readings must be a list'
+        
+        for index, reading in enumerate(readings):
+            error = validate_reading(reading)
+            if error:
+                return None, None, None, f'Reading {index}: {error}'
+        
+        device_ids = [reading.get('device_id') for reading in readings]
+        features = [[reading[field] for field in REQUIRED_FIELDS] for reading in readings]
+        
+        # Ad-hoc readings are not stored, so there is no row to link to
+        return device_ids, [None] * len(readings), features, None
+    
+    # Otherwise use the latest reading of the requested (or every) device
+    query = LatestSensorReading.query
+    
+    if payload.get('device_ids'):
+        if not isinstance(payload['device_ids'], list):
+            return None, None, None, 'device_ids must be a list'
+        query = query.filter(LatestSensorReading.device_id.in_(payload['device_ids']))
+    
+    latest = query.order_by(LatestSensorReading.device_id).all()
+    
+    device_ids = [data.device_id for data in latest]
+    sensor_data_ids = [data.sensor_data_id for data in latest]
+    features = [[getattr(data, field) for field in REQUIRED_FIELDS] for data in latest]
+    return device_ids, sensor_data_ids, features, None
+
+def load_batch_payload():
+    """Return (payload, error) for a batch request body"""
+    payload = request.get_json(silent=True)
+    
+    if payload is None:
+        return {}, None
+    
+    if not isinstance(payload, dict):
+        return None, 'Request body must be a JSON object'
+    
+    return payload, None
+
+def cached_batch(keys, compute):
+    """Look every row up in the recommendation cache and run one inference pass for the misses"""
+    cache = current_app.recommendation_cache
+    results = [cache.get(key) for key in keys]
+    missing = [index for index, result in enumerate(results) if result is None]
+    
+    if missing:
+        for index, result in zip(missing, compute(missing)):
+            results[index] = result
+            cache.put(keys[index], result)
+    
+    return results
+
+def store_batch_if_changed(rec_type, field, device_ids, sensor_data_ids, values):
+    """Batch counterpart of store_if_changed: one commit for every changed row"""
+    changed = [
+        device_id
+        for device_id, sensor_data_id, value in zip(device_ids, sensor_data_ids, values)
+        # Ad-hoc readings are answered but not kept or pushed, even when they
+        # name a device: only results for a device's stored reading are history
+        if sensor_data_id is not None
+        and record_if_changed(rec_type, device_id, field, value, sensor_data_id)
+    ]
+    
+    if changed:
+        db.session.commit()
+        current_app.event_broker.notify()
+
+@recommendation_bp.route('/crops/batch', methods=['POST'])
+def get_crop_recommendations_batch():
+    try:
+        payload, error = load_batch_payload()
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        recommender = current_app.components.get('crop_recommender')
+        n_classes = len(recommender.crop_labels)
+        top_k = payload.get('top_k', 3)
+        
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= n_classes:
+            return jsonify({'error': f'top_k must be an integer between 1 and {n_classes}'}), 400
+        
+        device_ids, sensor_data_ids, features, error = load_batch_inputs(payload)
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if not features:
+            return jsonify({'error': 'No data available'}), 404
+        
+        # Top-3 entries are shared with the single-device endpoint
+        cache = current_app.recommendation_cache
+        kind = 'crop' if top_k == 3 else f'crop_top{top_k}'
+        keys = [cache.make_key(kind, recommender.model_version, row) for row in features]
+        
+        # Single inference pass for the rows the cache does not hold
+        batch = cached_batch(keys, lambda missing: recommender.recommend_crops_batch(
+            [features[index] for index in missing], top_k
+        ))
+        
+        # History and dashboards hold top-3 lists; other k values are answer-only
+        if top_k == 3:
+            store_batch_if_changed('crop', 'recommendations', device_ids, sensor_data_ids, batch)
+        
+        results = [
+            {
+                'device_id': device_id,
+                'recommendations': recommendations
+            }
+            for device_id, recommendations in zip(device_ids, batch)
+        ]
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'modelVersion': recommender.model_version,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error generating batch crop recommendations: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@recommendation_bp.route('/fertilizer/batch', methods=['POST'])
+def get_fertilizer_recommendations_batch():
+    try:
+        payload, error = load_batch_payload()
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        default_crop = payload.get('crop', 'Wheat')
+        
+        device_ids, sensor_data_ids, features, error = load_batch_inputs(payload)
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if not features:
+            return jsonify({'error': 'No data available'}), 404
+        
+        # Readings may name their own crop; device batches use the shared one
+        crops = [
+            reading.get('crop', default_crop) for reading in payload['readings']
+        ] if payload.get('readings') else [default_crop] * len(features)
+        
+        if not all(isinstance(crop, str) for crop in crops):
+            return jsonify({'error': 'crop must be a string'}), 400
+        
+        recommender = current_app.components.get('fertilizer_recommender')
+        cache = current_app.recommendation_cache
+        keys = [
+            cache.make_key('fertilizer', recommender.model_version, row, crop)
+            for row, crop in zip(features, crops)
+        ]
+        
+        # Single inference pass for the rows the cache does not hold
+        batch = cached_batch(keys, lambda missing: recommender.recommend_fertilizer_batch(
+            [features[index] for index in missing], [crops[index] for index in missing]
+        ))
+        
+        store_batch_if_changed('fertilizer', 'recommendation', device_ids, sensor_data_ids, batch)
+        
+        results = [
+            {
+                'device_id': device_id,
+                'recommendation': recommendation
+            }
+            for device_id, recommendation in zip(device_ids, batch)
+        ]
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'modelVersion': recommender.model_version,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error generating batch fertilizer recommendations: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@recommendation_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(current_app.recommendation_cache.stats()), 200
+
 @recommendation_bp.route('/history', methods=['GET'])
 def get_recommendation_history():
     try:
-        limit = request.args.get('limit', 10, type=int)
+        limit = page_limit(10)
         rec_type = request.args.get('type', None)
+        device_id = request.args.get('device_id', None)
         
         query = Recommendation.query
         
         if rec_type:
             query = query.filter(Recommendation.recommendation_type == rec_type)
         
-        recommendations = query.order_by(
-            Recommendation.timestamp.desc()
-        ).limit(limit).all()
+        if device_id:
+            query = query.filter(Recommendation.device_id == device_id)
+        
+        try:
+            recommendations, next_cursor = paginate_newest_first(
+                query, Recommendation.timestamp, Recommendation.id, limit, request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'recommendations': [rec.to_dict() for rec in recommendations],
-            'count': len(recommendations)
+            'count': len(recommendations),
+            'nextCursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -0,0 +1,79 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ComponentRegistry:
+    def __init__(self):
+        # Heavy components are built on first use instead of at import time
+        self.factories = {}
+        self.instances = {}
+        self.errors = {}
+        self.load_times = {}
+        self.lock = threading.Lock()
+    
+    def register(self, name, factory):
+        self.factories[name] = factory
+    
+    def get(self, name):
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        
+        with self.lock:
+            # Another thread may have finished loading while we waited
+            instance = self.instances.get(name)
+            if instance is not None:
+                return instance
+            
+            started = time.perf_counter()
+            try:
+                instance = self.factories[name]()
+            except Exception as e:
+                self.errors[name] = str(e)
+                raise
+            
+            self.load_times[name] = round(time.perf_counter() - started, 3)
+            self.errors.pop(name, None)
+            self.instances[name] = instance
+            
+            logger.info(f'Loaded {name} in {self.load_times[name]}s')
+            return instance
+    
+    def is_loaded(self, name):
+        return name in self.instances
+    
+    def replace(self, name, instance):
+        # A single dict assignment, so readers see either the old or new object
+        self.instances[name] = instance
+    
+    def warmup(self, names=None, background=True):
+        names = list(names or self.factories)
+        
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f'Warmup of {name} failed: {str(e)}')
+        
+        if not background:
+            load_all()
+            return None
+        
+        thread = threading.Thread(target=load_all, name='component-warmup', daemon=True)
+        thread.start()
+        return thread
+    
+    def status(self):
+        components = {}
+        for name in self.factories:
+            if name in self.instances:
+                components[name] = {'status': 'ready', 'loadSeconds': self.load_times.get(name)}
+            elif name in self.errors:
+                components[name] = {'status': 'failed', 'error': self.errors[name]}
+            else:
+                components[name] = {'status': 'pending'}
+        
+        return components
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+import heapq
+import os
+from urllib.parse import quote
+from backend.models import SensorData
+from backend.utils.database import db
+
+ARCHIVE_COLUMNS = [
+    'id', 'device_id', 'timestamp', 'moisture', 'temperature', 'humidity',
+    'nitrogen', 'phosphorus', 'potassium'
+]
+
+class ArchivedReading:
+    # Read-only stand-in for SensorData rows that live in the Parquet tier
+    __slots__ = ARCHIVE_COLUMNS
+    
+    def __init__(self, **values):
+        for column in ARCHIVE_COLUMNS:
+            setattr(self, column, values.get(column))
+    
+    def to_dict(self):
+        data = {column: getattr(self, column) for column in ARCHIVE_COLUMNS}
+        data['timestamp'] = self.timestamp.isoformat()
+        return data
+
+def _load_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('pyarrow is required to read or write archived sensor data')
+    
+    return pa, pq
+
+def _archive_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('device_id', pa.string()),
+        ('timestamp', pa.timestamp('us')),
+        ('moisture', pa.float64()),
+        ('temperature', pa.float64()),
+        ('humidity', pa.float64()),
+        ('nitrogen', pa.int32()),
+        ('phosphorus', pa.int32()),
+        ('potassium', pa.int32())
+    ])
+
+def _partition_dir(archive_dir, device_id, day):
+    # Hive-style layout: <archive>/device_id=<id>/date=<YYYY-MM-DD>/
+    return os.path.join(
+        archive_dir,
+        f'device_id={quote(device_id, safe="")}',
+        f'date={day.isoformat()}'
+    )
+
+def compact_sensor_data(archive_dir, max_age_days, chunk_size=50000):
+    """Move raw readings older than `max_age_days` into Parquet partitions"""
+    pa, pq = _load_pyarrow()
+    schema = _archive_schema(pa)
+    
+    # Only whole days are compacted so every partition is written once
+    cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    compacted = 0
+    
+    while True:
+        rows = SensorData.query.filter(
+            SensorData.timestamp < cutoff
+        ).order_by(SensorData.id).limit(chunk_size).all()
+        
+        if not rows:
+            break
+        
+        partitions = {}
+        for row in rows:
+            key = (row.device_id, row.timestamp.date())
+            partitions.setdefault(key, []).append(row)
+        
+        for (device_id, day), partition in partitions.items():
+            directory = _partition_dir(archive_dir, device_id, day)
+            os.makedirs(directory, exist_ok=True)
+            
+            # Names derive from the row ids, so re-running after a crash
+            # overwrites the same file instead of duplicating rows
+            path = os.path.join(directory, f'part-{partition[0].id}-{partition[-1].id}.parquet')
+            table = pa.Table.from_pylist(
+                [{column: getattr(row, column) for column in ARCHIVE_COLUMNS} for row in partition],
+                schema=schema
+            )
+            
+            pq.write_table(table, path + '.tmp')
+            os.replace(path + '.tmp', path)
+        
+        # Files are durable before the hot rows are removed
+        ids = [row.id for row in rows]
+        SensorData.query.filter(SensorData.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expunge_all()
+        
+        compacted += len(rows)
+    
+    return compacted
+
+def read_archived_data(archive_dir, start, end=None, device_id=None):
+    """Read archived readings in [start, end), oldest first"""
+    if not os.path.isdir(archive_dir):
+        return []
+    
+    _, pq = _load_pyarrow()
+    end = end or datetime.utcnow()
+    
+    if device_id:
+        device_dirs = [f'device_id={quote(device_id, safe="")}']
+    else:
+        device_dirs = [name for name in os.listdir(archive_dir) if name.startswith('device_id=')]
+    
+    data = []
+    for device_dir in device_dirs:
+        device_path = os.path.join(archive_dir, device_dir)
+        if not os.path.isdir(device_path):
+            continue
+        
+        # Partition pruning: only open the days inside the requested range
+        for date_dir in os.listdir(device_path):
+            day = datetime.strptime(date_dir[len('date='):], '%Y-%m-%d').date()
+            if day < start.date() or day > end.date():
+                continue
+            
+            date_path = os.path.join(device_path, date_dir)
+            for name in os.listdir(date_path):
+                if not name.endswith('.parquet'):
+                    continue
+                
+                for values in pq.read_table(os.path.join(date_path, name)).to_pylist():
+                    if start <= values['timestamp'] < end:
+                        data.append(ArchivedReading(**values))
+    
+    data.sort(key=lambda d: d.timestamp)
+    
+    return data
+
+def merge_tiers(archived, hot):
+    """Merge archived and hot readings, both sorted by timestamp"""
+    return list(heapq.merge(archived, hot, key=lambda d: d.timestamp))
@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from backend.models import SensorData, SensorRollup
+from backend.utils.database import db
+
+ROLLUP_RESOLUTIONS = ['hour', 'day']
+
+def bucket_start(timestamp, resolution):
+    """Truncate a timestamp to the start of its rollup bucket"""
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def aggregate_rows(rows):
+    """Fold raw readings into partial rollups keyed by (device, resolution, bucket)"""
+    aggregates = {}
+    
+    for row in rows:
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (row['device_id'], resolution, bucket_start(row['timestamp'], resolution))
+            aggregate = aggregates.get(key)
+            
+            if aggregate is None:
+                aggregate = {
+                    'device_id': key[0],
+                    'resolution': resolution,
+                    'bucket_start': key[2],
+                    'count': 0,
+                    'last_timestamp': row['timestamp']
+                }
+                for metric in SensorRollup.METRICS:
+                    aggregate[f'{metric}_sum'] = 0.0
+                    aggregate[f'{metric}_min'] = row[metric]
+                    aggregate[f'{metric}_max'] = row[metric]
+                    aggregate[f'{metric}_last'] = row[metric]
+                aggregates[key] = aggregate
+            
+            aggregate['count'] += 1
+            is_last = row['timestamp'] >= aggregate['last_timestamp']
+            if is_last:
+                aggregate['last_timestamp'] = row['timestamp']
+            
+            for metric in SensorRollup.METRICS:
+                value = row[metric]
+                aggregate[f'{metric}_sum'] += value
+                aggregate[f'{metric}_min'] = min(aggregate[f'{metric}_min'], value)
+                aggregate[f'{metric}_max'] = max(aggregate[f'{metric}_max'], value)
+                if is_last:
+                    aggregate[f'{metric}_last'] = value
+    
+    return list(aggregates.values())
+
+def _upsert_statement(dialect):
+    # INSERT ... ON CONFLICT DO UPDATE merges partial rollups atomically, so
+    # concurrent workers never race on the same bucket
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        least, greatest = func.least, func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        least, greatest = func.min, func.max
+    
+    table = SensorRollup.__table__
+    statement = insert(table)
+    excluded = statement.excluded
+    newer = excluded.last_timestamp >= table.c.last_timestamp
+    
+    updates = {
+        'count': table.c.count + excluded.count,
+        'last_timestamp': greatest(table.c.last_timestamp, excluded.last_timestamp)
+    }
+    for metric in SensorRollup.METRICS:
+        updates[f'{metric}_sum'] = table.c[f'{metric}_sum'] + excluded[f'{metric}_sum']
+        updates[f'{metric}_min'] = least(table.c[f'{metric}_min'], excluded[f'{metric}_min'])
+        updates[f'{metric}_max'] = greatest(table.c[f'{metric}_max'], excluded[f'{metric}_max'])
+        updates[f'{metric}_last'] = case(
+            (newer, excluded[f'{metric}_last']),
+            else_=table.c[f'{metric}_last']
+        )
+    
+    return statement.on_conflict_do_update(
+        index_elements=['device_id', 'resolution', 'bucket_start'],
+        set_=updates
+    )
+
+def _merge_rollup(aggregate):
+    # Portable fallback for backends without ON CONFLICT
+    rollup = SensorRollup.query.filter_by(
+        device_id=aggregate['device_id'],
+        resolution=aggregate['resolution'],
+        bucket_start=aggregate['bucket_start']
+    ).with_for_update().first()
+    
+    if rollup is None:
+        db.session.add(SensorRollup(**aggregate))
+        return
+    
+    newer = aggregate['last_timestamp'] >= rollup.last_timestamp
+    rollup.count += aggregate['count']
+    rollup.last_timestamp = max(rollup.last_timestamp, aggregate['last_timestamp'])
+    
+    for metric in SensorRollup.METRICS:
+        setattr(rollup, f'{metric}_sum', getattr(rollup, f'{metric}_sum') + aggregate[f'{metric}_sum'])
+        setattr(rollup, f'{metric}_min', min(getattr(rollup, f'{metric}_min'), aggregate[f'{metric}_min']))
+        setattr(rollup, f'{metric}_max', max(getattr(rollup, f'{metric}_max'), aggregate[f'{metric}_max']))
+        if newer:
+            setattr(rollup, f'{metric}_last', aggregate[f'{metric}_last'])
+
+def update_rollups(rows):
+    """Fold newly ingested rows into the hourly and daily rollups"""
+    aggregates = aggregate_rows(rows)
+    
+    if not aggregates:
+        return
+    
+    dialect = db.engine.dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        db.session.execute(_upsert_statement(dialect), aggregates)
+    else:
+        for aggregate in aggregates:
+            _merge_rollup(aggregate)
+
+def backfill_rollups(days=None, chunk_size=5000):
+    """Rebuild rollups from raw sensor data, optionally only for the last `days`"""
+    oldest = db.session.query(func.min(SensorData.timestamp)).scalar()
+    if oldest is None:
+        return 0
+    
+    # Buckets before the oldest hot reading were built from rows that have
+    # since been compacted to Parquet, so they cannot be rebuilt and are kept.
+    # Compaction moves whole days, so starting on a day boundary is safe.
+    cutoff = bucket_start(oldest, 'day')
+    if days is not None:
+        # Start on a day boundary so every rebuilt bucket is complete
+        cutoff = max(cutoff, bucket_start(datetime.utcnow() - timedelta(days=days), 'day'))
+    
+    query = SensorData.query.filter(SensorData.timestamp >= cutoff)
+    SensorRollup.query.filter(
+        SensorRollup.bucket_start >= cutoff
+    ).delete(synchronize_session=False)
+    
+    rows = []
+    processed = 0
+    
+    # Stream raw rows so memory stays flat regardless of table size
+    for data in query.order_by(SensorData.device_id, SensorData.timestamp).yield_per(chunk_size):
+        rows.append({
+            'device_id': data.device_id,
+            'timestamp': data.timestamp,
+            **{metric: getattr(data, metric) for metric in SensorRollup.METRICS}
+        })
+        
+        if len(rows) >= chunk_size:
+            update_rollups(rows)
+            processed += len(rows)
+            rows = []
+    
+    update_rollups(rows)
+    processed += len(rows)
+    
+    db.session.commit()
+    
+    return processed
+
+def get_rollup_history(days, device_id=None, resolution='day'):
+    """Chart data for a long time range, read from rollups instead of raw rows"""
+    cutoff = bucket_start(datetime.utcnow() - timedelta(days=days), resolution)
+    
+    total = func.sum(SensorRollup.count)
+    columns = [SensorRollup.bucket_start, total]
+    for metric in SensorRollup.METRICS:
+        columns.extend([
+            func.min(getattr(SensorRollup, f'{metric}_min')),
+            func.sum(getattr(SensorRollup, f'{metric}_sum')),
+            func.max(getattr(SensorRollup, f'{metric}_max'))
+        ])
+    
+    query = db.session.query(*columns).filter(
+        SensorRollup.resolution == resolution,
+        SensorRollup.bucket_start >= cutoff
+    )
+    
+    if device_id:
+        query = query.filter(SensorRollup.device_id == device_id)
+    
+    rows = query.group_by(SensorRollup.bucket_start).order_by(SensorRollup.bucket_start).all()
+    
+    chart_data = {
+        'timestamps': [row[0].isoformat() for row in rows],
+        'counts': [row[1] for row in rows],
+        'resolution': resolution,
+        'min': {},
+        'max': {}
+    }
+    
+    for i, metric in enumerate(SensorRollup.METRICS):
+        position = 2 + i * 3
+        chart_data['min'][metric] = [row[position] for row in rows]
+        chart_data[metric] = [
+            round(row[position + 1] / row[1], 2) if row[1] else None for row in rows
+        ]
+        chart_data['max'][metric] = [row[position + 2] for row in rows]
+    
+    return chart_data
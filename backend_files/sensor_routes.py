@@ -1,12 +1,34 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
-from backend.models import SensorData, Alert
-from backend.utils.database import db
+import json
+from backend.models import SensorData
+from backend.utils.ingest import validate_reading, store_sensor_readings, parse_timestamp
+from backend.utils.ingest_queue import QueueFull
+from backend.utils.wire_format import (
+    BINARY_MIMETYPES, MSGPACK_MIMETYPES, FrameError, frame_to_items, decode_msgpack
+)
+from backend.utils.helpers import (
+    get_latest_reading, encode_cursor, after_cursor, page_limit, paginate_newest_first
+)
+from backend.utils.export import EXPORT_FORMATS, WRITERS, export_query, iter_chunks
 
 sensor_bp = Blueprint('sensor', __name__, url_prefix='/api/sensor')
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def queue_full_response():
+    # Backpressure: devices should hold the reading and retry later
+    retry_after = current_app.config['INGEST_RETRY_AFTER']
+    response = jsonify({'error': 'Ingest queue is full', 'retryAfter': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
 @sensor_bp.route('/data', methods=['POST'])
 def receive_sensor_data():
+    # Binary and MessagePack frames may carry several readings
+    if request.mimetype in BINARY_MIMETYPES + MSGPACK_MIMETYPES:
+        return receive_sensor_data_batch()
+    
     try:
         data = request.get_json()
         
@@ -14,59 +36,159 @@ def receive_sensor_data():
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
-        required_fields = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing field: {field}'}), 400
-        
-        # Process the data
-        processed_data = current_app.data_processor.process_incoming_data(data)
-        
-        # Store in database
-        sensor_data = SensorData(
-            device_id=data.get('device_id', 'unknown'),
-            moisture=data['moisture'],
-            temperature=data['temperature'],
-            humidity=data['humidity'],
-            nitrogen=data['nitrogen'],
-            phosphorus=data['phosphorus'],
-            potassium=data['potassium']
-        )
-        
-        db.session.add(sensor_data)
-        db.session.commit()
-        
-        # Generate alerts
-        alerts = current_app.analytics_engine.generate_alerts(
-            data, 
-            current_app.data_processor.sensor_data.to_dict('list')
-        )
+        error = validate_reading(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Store alerts in database
-        for alert in alerts:
-            alert_record = Alert(
-                type=alert['type'],
-                message=alert['message'],
-                severity=alert['severity']
-            )
-            db.session.add(alert_record)
+        if current_app.ingest_queue is not None:
+            try:
+                sequence = current_app.ingest_queue.submit([data])[0]
+            except QueueFull:
+                return queue_full_response()
+            
+            return jsonify({
+                'message': 'Data accepted for processing',
+                'sequence': sequence
+            }), 202
         
-        db.session.commit()
+        # Process, store and evaluate alerts in a single transaction
+        result = store_sensor_readings([data])[0]
         
         return jsonify({
             'message': 'Data received and processed successfully',
-            'data': processed_data,
-            'alerts': alerts
+            'data': result['data'],
+            'alerts': result['alerts']
         }), 201
         
     except Exception as e:
         current_app.logger.error(f'Error processing sensor data: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+def parse_batch_payload():
+    """Return (reading, error) pairs from a JSON array, NDJSON, binary or MessagePack body"""
+    if request.mimetype in BINARY_MIMETYPES:
+        # Already validated column-wise while decoding
+        return frame_to_items(request.get_data()), True
+    
+    if request.mimetype in MSGPACK_MIMETYPES:
+        return [(item, None) for item in decode_msgpack(request.get_data())], False
+    
+    if request.mimetype in NDJSON_MIMETYPES:
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append((json.loads(line), None))
+            except ValueError:
+                items.append((None, 'Invalid JSON'))
+        return items, False
+    
+    payload = request.get_json(silent=True)
+    
+    # Accept either a bare array or {"readings": [...]}
+    if isinstance(payload, dict):
+        payload = payload.get('readings')
+    
+    if not isinstance(payload, list):
+        return None, False
+    
+    return [(item, None) for item in payload], False
+
+@sensor_bp.route('/data/batch', methods=['POST'])
+def receive_sensor_data_batch():
+    try:
+        try:
+            items, validated = parse_batch_payload()
+        except FrameError as e:
+            return jsonify({'error': str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 415
+        
+        if not items:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        max_size = current_app.config['SENSOR_BATCH_MAX_SIZE']
+        if len(items) > max_size:
+            return jsonify({'error': f'Batch too large (max {max_size} readings)'}), 413
+        
+        # Validate the whole batch before touching the database
+        results = []
+        valid_readings = []
+        valid_results = []
+        for index, (reading, error) in enumerate(items):
+            if not (error or validated):
+                error = validate_reading(reading)
+            result = {'index': index}
+            
+            if error:
+                result.update({'status': 'rejected', 'error': error})
+            else:
+                valid_readings.append(reading)
+                valid_results.append(result)
+            
+            results.append(result)
+        
+        if not valid_readings:
+            return jsonify({
+                'error': 'No valid readings in batch',
+                'results': results
+            }), 400
+        
+        rejected = len(results) - len(valid_readings)
+        
+        if current_app.ingest_queue is not None:
+            try:
+                sequences = current_app.ingest_queue.submit(valid_readings)
+            except QueueFull:
+                return queue_full_response()
+            
+            for result, sequence in zip(valid_results, sequences):
+                result.update({'status': 'accepted', 'sequence': sequence})
+            
+            return jsonify({
+                'message': 'Batch accepted for processing',
+                'accepted': len(valid_readings),
+                'rejected': rejected,
+                'results': results
+            }), 207 if rejected else 202
+        
+        stored = store_sensor_readings(valid_readings)
+        
+        for result, record in zip(valid_results, stored):
+            result.update({
+                'status': 'created',
+                'id': record['id'],
+                'alerts': record['alerts']
+            })
+        
+        return jsonify({
+            'message': 'Batch received and processed',
+            'accepted': len(valid_readings),
+            'rejected': rejected,
+            'results': results
+        }), 207 if rejected else 201
+        
+    except Exception as e:
+        current_app.logger.error(f'Error processing sensor data batch: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@sensor_bp.route('/ingest/status', methods=['GET'])
+def get_ingest_status():
+    ingest_queue = current_app.ingest_queue
+    
+    if ingest_queue is None:
+        return jsonify({'mode': 'sync', 'alerts': current_app.alert_manager.stats()}), 200
+    
+    status = ingest_queue.stats()
+    status['mode'] = 'queue'
+    status['alerts'] = current_app.alert_manager.stats()
+    return jsonify(status), 200
+
 @sensor_bp.route('/data', methods=['GET'])
 def get_sensor_data():
     try:
-        limit = request.args.get('limit', 100, type=int)
+        limit = page_limit(100)
         device_id = request.args.get('device_id', None)
         
         query = SensorData.query
@@ -74,28 +196,87 @@ def get_sensor_data():
         if device_id:
             query = query.filter(SensorData.device_id == device_id)
         
-        data = query.order_by(SensorData.timestamp.desc()).limit(limit).all()
+        try:
+            data, next_cursor = paginate_newest_first(
+                query, SensorData.timestamp, SensorData.id, limit, request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'data': [d.to_dict() for d in data],
-            'count': len(data)
+            'count': len(data),
+            'nextCursor': next_cursor
         }), 200
         
     except Exception as e:
         current_app.logger.error(f'Error retrieving sensor data: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
-@sensor_bp.route('/data/latest', methods=['GET'])
-def get_latest_sensor_data():
+@sensor_bp.route('/export', methods=['GET'])
+def export_sensor_data():
     try:
+        export_format = request.args.get('format', 'ndjson')
         device_id = request.args.get('device_id', None)
+        cursor = request.args.get('after', None)
+        # Unpaged unless a limit is given; a given one is clamped like listings
+        limit = page_limit(current_app.config['PAGE_MAX_LIMIT']) if request.args.get('limit') else None
         
-        query = SensorData.query
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}'}), 400
         
-        if device_id:
-            query = query.filter(SensorData.device_id == device_id)
+        try:
+            start = parse_timestamp(request.args['from']) if request.args.get('from') else None
+            end = parse_timestamp(request.args['to']) if request.args.get('to') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'from and to must be ISO-8601 timestamps'}), 400
+        
+        query = export_query(start, end, device_id)
+        
+        # Keyset pagination: resume after the (timestamp, id) of a cursor
+        if cursor:
+            try:
+                query = after_cursor(query, SensorData.timestamp, SensorData.id, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        headers = {}
+        if limit:
+            # The page boundary is found up front so the cursor can go in a header;
+            # the row after it tells whether another page exists
+            boundary = query.offset(limit - 1).limit(2).all()
+            if len(boundary) == 2:
+                headers['X-Next-Cursor'] = encode_cursor(boundary[0].timestamp, boundary[0].id)
+            query = query.limit(limit)
+        
+        if export_format == 'parquet':
+            from backend.utils.retention import _load_pyarrow
+            try:
+                _load_pyarrow()
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 501
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        headers['Content-Disposition'] = f'attachment; filename=sensor_data.{extension}'
+        
+        chunks = iter_chunks(query, current_app.config['EXPORT_CHUNK_SIZE'])
+        
+        return Response(
+            stream_with_context(WRITERS[export_format](chunks)),
+            mimetype=mimetype,
+            headers=headers
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f'Error exporting sensor data: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@sensor_bp.route('/data/latest', methods=['GET'])
+def get_latest_sensor_data():
+    try:
+        device_id = request.args.get('device_id', None)
         
-        data = query.order_by(SensorData.timestamp.desc()).first()
+        data = get_latest_reading(device_id)
         
         if not data:
             return jsonify({'error': 'No data found'}), 404
@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from datetime import datetime
+import queue
+from backend.models import Alert
+from backend.utils.events import format_sse
+from backend.utils.helpers import get_latest_reading, get_downsampled_history
+
+stream_bp = Blueprint('stream', __name__, url_prefix='/api/stream')
+
+def build_snapshot(latest_data):
+    """Initial dashboard state sent when a stream opens"""
+    device_id = latest_data.device_id
+    
+    current_conditions = {
+        'moisture': latest_data.moisture,
+        'temperature': latest_data.temperature,
+        'nitrogen': latest_data.nitrogen,
+        'phosphorus': latest_data.phosphorus,
+        'potassium': latest_data.potassium
+    }
+    
+    analytics_engine = current_app.components.get('analytics_engine')
+    active_alerts = Alert.query.filter_by(resolved=False, device_id=device_id).all()
+    
+    return {
+        'current': latest_data.to_dict(),
+        'historical': get_downsampled_history(7, device_id, current_app.config['CHART_POINTS']),
+        'healthScore': analytics_engine.assess_crop_health(current_conditions),
+        'alerts': [alert.to_dict() for alert in active_alerts],
+        'device_id': device_id,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+@stream_bp.route('', methods=['GET'])
+def stream_events():
+    try:
+        device_id = request.args.get('device_id', None)
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        
+        # Scope the stream to one device, like /api/analytics/current
+        latest_data = get_latest_reading(device_id)
+        if latest_data:
+            device_id = latest_data.device_id
+        
+        # Subscribe before building the snapshot so nothing published in
+        # between is lost (at worst a reading arrives in both)
+        broker = current_app.event_broker
+        subscription = broker.subscribe(device_id, last_event_id)
+        
+        if subscription is None:
+            return jsonify({'error': 'Too many open streams'}), 503
+        
+        # A reconnecting client already has a snapshot and only needs the gap
+        try:
+            snapshot = build_snapshot(latest_data) if latest_data and last_event_id is None else None
+        except Exception:
+            broker.unsubscribe(subscription)
+            raise
+        
+        heartbeat = current_app.config['STREAM_HEARTBEAT_SECONDS']
+        
+    except Exception as e:
+        current_app.logger.error(f'Error opening event stream: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    def generate():
+        try:
+            # Browsers reconnect 5 s after a dropped stream, sending Last-Event-ID
+            yield 'retry: 5000\n\n'
+            
+            if snapshot is not None:
+                yield format_sse(snapshot, 'snapshot')
+            
+            while True:
+                try:
+                    event = subscription.events.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keep-alive\n\n'
+                    continue
+                
+                yield format_sse(event['data'], event['type'], event['id'])
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@stream_bp.route('/stats', methods=['GET'])
+def get_stream_stats():
+    return jsonify(current_app.event_broker.stats()), 200
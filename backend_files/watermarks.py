@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+import threading
+import time
+from flask import current_app, request, make_response
+from sqlalchemy import func
+from backend.utils.database import db
+
+class DataWatermarks:
+    # Alert changes committed just before the last refresh may carry a
+    # slightly older updated_at, so each refresh re-reads this margin
+    ALERT_OVERLAP = timedelta(seconds=60)
+    
+    def __init__(self, refresh_interval=5):
+        # Per-device version of the data behind the analytics endpoints: the
+        # last ingested sensor_data id plus the last alert open/resolve time.
+        # Both come from the database, so every worker derives the same ETag;
+        # other workers' writes are picked up by a periodic cheap refresh.
+        self.refresh_interval = refresh_interval
+        self.ids = {}
+        self.alert_marks = {}
+        self.modified = {}
+        self.alerts_checked = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+    
+    def advance(self, rows):
+        """Record freshly committed sensor rows"""
+        now = datetime.utcnow().replace(microsecond=0)
+        
+        with self.lock:
+            for row in rows:
+                device_id = row['device_id']
+                if row.get('id') and row['id'] > self.ids.get(device_id, 0):
+                    self.ids[device_id] = row['id']
+                    self.modified[device_id] = now
+    
+    def bump(self, device_id):
+        """Mark a device's alerts as changed; re-read them on the next request"""
+        with self.lock:
+            self.refreshed_at = None
+    
+    def _touch(self, device_id, modified):
+        modified = modified.replace(microsecond=0)
+        if self.modified.get(device_id) is None or modified > self.modified[device_id]:
+            self.modified[device_id] = modified
+    
+    def refresh(self):
+        from backend.models import LatestSensorReading, Alert
+        
+        rows = LatestSensorReading.query.with_entities(
+            LatestSensorReading.device_id,
+            LatestSensorReading.sensor_data_id,
+            LatestSensorReading.timestamp
+        ).all()
+        
+        # Only alerts changed since the last refresh; the updated_at index keeps it cheap
+        alerts = db.session.query(Alert.device_id, func.max(Alert.updated_at))
+        if self.alerts_checked is not None:
+            alerts = alerts.filter(Alert.updated_at > self.alerts_checked - self.ALERT_OVERLAP)
+        alerts = alerts.filter(Alert.updated_at.isnot(None)).group_by(Alert.device_id).all()
+        
+        with self.lock:
+            for device_id, sensor_data_id, timestamp in rows:
+                if sensor_data_id and sensor_data_id > self.ids.get(device_id, 0):
+                    self.ids[device_id] = sensor_data_id
+                    self._touch(device_id, timestamp)
+            
+            for device_id, updated_at in alerts:
+                if device_id not in self.alert_marks or updated_at > self.alert_marks[device_id]:
+                    self.alert_marks[device_id] = updated_at
+                    self._touch(device_id, updated_at)
+                if self.alerts_checked is None or updated_at > self.alerts_checked:
+                    self.alerts_checked = updated_at
+            
+            if self.alerts_checked is None:
+                self.alerts_checked = datetime.utcnow()
+            self.refreshed_at = time.monotonic()
+    
+    def _alert_mark(self, device_id):
+        mark = self.alert_marks.get(device_id)
+        return mark.strftime('%Y%m%d%H%M%S%f') if mark else '0'
+    
+    def current(self, device_id=None):
+        """Return (etag, last_modified) for one device, or the whole fleet"""
+        if self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.refresh_interval:
+            self.refresh()
+        
+        with self.lock:
+            if device_id:
+                etag = f'{device_id}:{self.ids.get(device_id, 0)}:{self._alert_mark(device_id)}'
+                return etag, self.modified.get(device_id)
+            
+            # Device-less requests follow the newest reading or alert change of any device
+            newest_alert = max(self.alert_marks, key=self.alert_marks.get, default=None)
+            etag = f'*:{max(self.ids.values(), default=0)}:{self._alert_mark(newest_alert)}'
+            return etag, max(self.modified.values(), default=None)
+
+class PayloadCache:
+    def __init__(self, maxsize=256):
+        # Serialized response bodies, valid while their ETag is current
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            
+            self.entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key, etag, body):
+        with self.lock:
+            self.entries[key] = (etag, body)
+            self.entries.move_to_end(key)
+            
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+def watermark_cached(view):
+    """Serve 304s and cached bodies for a GET view until the data watermark moves"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag, last_modified = current_app.watermarks.current(request.args.get('device_id'))
+        
+        # The client's copy is current: nothing is queried or serialized
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        cache = current_app.payload_cache
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        body = cache.get(key, etag)
+        
+        if body is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cache.put(key, etag, response.get_data())
+        else:
+            response = make_response(body)
+            response.mimetype = 'application/json'
+        
+        # no-cache: clients may store the response but must revalidate it
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        
+        return response.make_conditional(request)
+    
+    return wrapper
@@ -0,0 +1,108 @@
+from datetime import datetime
+import struct
+import numpy as np
+
+# Compact upload formats selected by Content-Type.
+#
+# Binary frame (little-endian), one device per frame:
+#   header  '<2sBBH'  magic b'SA', version, device_id length, record count
+#   device_id         UTF-8 bytes
+#   records '<Ifffhhh' x count (22 bytes each): age_seconds, moisture,
+#                     temperature, humidity, nitrogen, phosphorus, potassium
+# age_seconds is how long before sending the reading was taken, so devices
+# without a real-time clock can still upload buffered readings.
+
+BINARY_MIMETYPES = ('application/x-sensor-frame', 'application/octet-stream')
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+FRAME_MAGIC = b'SA'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sBBH')
+
+RECORD_DTYPE = np.dtype([
+    ('age_seconds', '<u4'),
+    ('moisture', '<f4'),
+    ('temperature', '<f4'),
+    ('humidity', '<f4'),
+    ('nitrogen', '<i2'),
+    ('phosphorus', '<i2'),
+    ('potassium', '<i2')
+])
+FLOAT_FIELDS = ['moisture', 'temperature', 'humidity']
+INT_FIELDS = ['nitrogen', 'phosphorus', 'potassium']
+
+class FrameError(ValueError):
+    """Raised for a malformed binary frame"""
+
+def decode_frame(body):
+    """Decode a binary frame into (device_id, columnar record array)"""
+    if len(body) < FRAME_HEADER.size:
+        raise FrameError('Frame too short')
+    
+    magic, version, id_length, count = FRAME_HEADER.unpack_from(body)
+    
+    if magic != FRAME_MAGIC:
+        raise FrameError('Bad frame magic')
+    if version != FRAME_VERSION:
+        raise FrameError(f'Unsupported frame version: {version}')
+    
+    offset = FRAME_HEADER.size + id_length
+    if len(body) != offset + count * RECORD_DTYPE.itemsize:
+        raise FrameError('Frame length does not match its record count')
+    
+    try:
+        device_id = body[FRAME_HEADER.size:offset].decode('utf-8') or 'unknown'
+    except UnicodeDecodeError:
+        raise FrameError('device_id is not valid UTF-8')
+    
+    # Zero-copy view over the request body, one field per column
+    records = np.frombuffer(body, dtype=RECORD_DTYPE, count=count, offset=offset)
+    
+    return device_id, records
+
+def frame_to_items(body, received_at=None):
+    """Decode a binary frame into (reading, error) pairs, validated column-wise"""
+    device_id, records = decode_frame(body)
+    received_at = np.datetime64(received_at or datetime.utcnow(), 's')
+    
+    timestamps = (received_at - records['age_seconds'].astype('timedelta64[s]')).astype(str)
+    
+    # One vectorized check instead of per-field checks per reading
+    finite = np.ones(len(records), dtype=bool)
+    for field in FLOAT_FIELDS:
+        finite &= np.isfinite(records[field])
+    
+    # float32 carries ~7 significant digits: round in float64 so 20.3 is
+    # stored as 20.3 rather than 20.299999237060547
+    columns = {field: records[field].astype(np.float64).round(2).tolist() for field in FLOAT_FIELDS}
+    columns.update({field: records[field].tolist() for field in INT_FIELDS})
+    
+    items = []
+    for index, timestamp in enumerate(timestamps.tolist()):
+        reading = {field: columns[field][index] for field in columns}
+        reading['device_id'] = device_id
+        reading['timestamp'] = timestamp
+        items.append((reading, None if finite[index] else 'Non-finite sensor value'))
+    
+    return items
+
+def decode_msgpack(body):
+    """Decode a MessagePack reading or array of readings"""
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError('msgpack is required to accept MessagePack uploads')
+    
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception:
+        raise FrameError('Invalid MessagePack payload')
+    
+    # Same shapes as JSON: one reading, an array, or {"readings": [...]}
+    if isinstance(payload, dict):
+        payload = payload.get('readings', [payload])
+    
+    if not isinstance(payload, list):
+        raise FrameError('MessagePack payload must be a reading or a list of readings')
+    
+    return payload
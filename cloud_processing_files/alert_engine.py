@@ -0,0 +1,126 @@
+from datetime import datetime
+import copy
+import threading
+from cloud_processing.analytics_engine import AnalyticsEngine
+
+def reading_key(reading):
+    """(timestamp, row id) ordering of a reading, or None without a timestamp"""
+    timestamp = reading.get('timestamp')
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    
+    return timestamp, reading.get('id') or 0
+
+class DeviceAlertState:
+    def __init__(self):
+        self.consecutive_dry = 0
+        self.active = {}
+        self.last_key = None
+
+class StreamingAlertEngine:
+    def __init__(self, window=5, hysteresis=None):
+        # Per-device state updated in O(1) per reading, independent of history
+        # size; `window` is how many recent readings a (re)seed replays
+        self.window = window
+        self.hysteresis = hysteresis or {}
+        self.states = {}
+        self.lock = threading.Lock()
+    
+    def seed(self, device_id, readings):
+        # Rebuild a device's state from its most recent readings (oldest first)
+        with self.lock:
+            self.states[device_id] = DeviceAlertState()
+            for reading in readings:
+                self._update(device_id, reading)
+    
+    def last_key(self, device_id):
+        """(timestamp, row id) of the newest reading evaluated for a device"""
+        state = self.states.get(device_id)
+        return state.last_key if state else None
+    
+    def update(self, device_id, reading):
+        with self.lock:
+            return self._update(device_id, reading)
+    
+    def snapshot(self, device_ids):
+        # Copies of per-device state, so a failed transaction can be undone
+        with self.lock:
+            return {device_id: copy.deepcopy(self.states.get(device_id)) for device_id in device_ids}
+    
+    def restore(self, snapshot):
+        with self.lock:
+            for device_id, state in snapshot.items():
+                if state is None:
+                    self.states.pop(device_id, None)
+                else:
+                    self.states[device_id] = state
+    
+    def update_batch(self, readings):
+        # Evaluated oldest first, results returned in the caller's order
+        results = [None] * len(readings)
+        
+        with self.lock:
+            for index in sorted(range(len(readings)), key=lambda i: reading_key(readings[i])):
+                reading = readings[index]
+                results[index] = self._update(reading.get('device_id', 'unknown'), reading)
+        
+        return results
+    
+    def _is_active(self, state, key, triggered, value, clear_at):
+        # Hysteresis: once active, a condition only clears past threshold + margin
+        if triggered:
+            state.active[key] = True
+        elif value >= clear_at + self.hysteresis.get(key, 0):
+            state.active[key] = False
+        
+        return state.active.get(key, False)
+    
+    def _update(self, device_id, reading):
+        state = self.states.get(device_id)
+        if state is None:
+            state = DeviceAlertState()
+            self.states[device_id] = state
+        
+        # Late (buffered) uploads are stored but never rewind the alert state;
+        # None tells callers the reading was not evaluated. Readings sharing a
+        # timestamp (e.g. one untimestamped batch) are ordered by row id.
+        key = reading_key(reading)
+        if key is not None:
+            if state.last_key is not None and key < state.last_key:
+                return None
+            state.last_key = key
+        
+        alerts = []
+        
+        # Water stress: consecutive dry readings
+        moisture = reading['moisture']
+        
+        if moisture < AnalyticsEngine.WATER_STRESS_THRESHOLD:
+            state.consecutive_dry += 1
+        else:
+            state.consecutive_dry = 0
+        
+        stressed = state.consecutive_dry >= AnalyticsEngine.WATER_STRESS_READINGS
+        if self._is_active(state, 'water_stress', stressed, moisture,
+                           AnalyticsEngine.WATER_STRESS_THRESHOLD):
+            alerts.append({
+                'type': 'water_stress',
+                'condition': 'water_stress',
+                'message': 'Water stress detected - irrigation recommended',
+                'severity': 'high'
+            })
+        
+        # Nutrient deficiency alerts
+        for nutrient, threshold, message in AnalyticsEngine.NUTRIENT_THRESHOLDS:
+            value = reading[nutrient]
+            if self._is_active(state, f'low_{nutrient}', value < threshold, value, threshold):
+                alerts.append({
+                    'type': 'nutrient_deficiency',
+                    'condition': f'low_{nutrient}',
+                    'message': message,
+                    'severity': 'medium'
+                })
+        
+        return alerts
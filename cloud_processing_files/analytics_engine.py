@@ -1,59 +1,128 @@
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 
 class AnalyticsEngine:
-    def __init__(self, historical_data):
+    # Alert thresholds, shared with the streaming alert engine
+    WATER_STRESS_THRESHOLD = 30  # percent
+    WATER_STRESS_READINGS = 3
+    NUTRIENT_THRESHOLDS = [
+        ('nitrogen', 30, 'Nitrogen level low'),
+        ('phosphorus', 15, 'Phosphorus level low'),
+        ('potassium', 50, 'Potassium level low')
+    ]
+    
+    # kg/ha at optimal moisture and nutrients
+    BASE_YIELD = {
+        'Wheat': 3000,
+        'Rice': 4000,
+        'Maize': 5000,
+        'Cotton': 800
+    }
+    DEFAULT_BASE_YIELD = 3000
+    
+    def __init__(self, historical_data=None):
         self.historical_data = historical_data
     
     def predict_yield(self, current_conditions, crop_type):
         # Simple linear model for demonstration
         # In real implementation, use more sophisticated models
-        base_yield = {
-            'Wheat': 3000,  # kg/ha
-            'Rice': 4000,
-            'Maize': 5000,
-            'Cotton': 800
-        }
-        
-        # Adjust yield based on conditions
-        moisture_factor = min(1.0, current_conditions['moisture'] / 60)
-        nutrient_factor = np.mean([
-            min(1.0, current_conditions['nitrogen'] / 100),
-            min(1.0, current_conditions['phosphorus'] / 50),
-            min(1.0, current_conditions['potassium'] / 150)
-        ])
+        return float(self.predict_yield_series(
+            {name: [value] for name, value in current_conditions.items()}, crop_type
+        )[0])
+    
+    def predict_yield_series(self, conditions, crop_type):
+        """Predicted yield for every reading in columnar `conditions` in one pass"""
+        # conditions: metric -> equal-length sequence (dict of lists/arrays or
+        # a DataFrame); crop_type: one crop name, or one per reading
+        moisture_factor = self._ratio(conditions['moisture'], 60)
+        nutrient_factor = self._nutrient_factor(conditions)
         
-        predicted_yield = base_yield.get(crop_type, 3000) * moisture_factor * nutrient_factor
+        if isinstance(crop_type, str):
+            base_yield = self.BASE_YIELD.get(crop_type, self.DEFAULT_BASE_YIELD)
+        else:
+            base_yield = np.array([
+                self.BASE_YIELD.get(crop, self.DEFAULT_BASE_YIELD) for crop in crop_type
+            ], dtype=np.float64)
         
-        return round(predicted_yield, 2)
+        return np.round(base_yield * moisture_factor * nutrient_factor, 2)
     
     def detect_water_stress(self, moisture_data):
-        # Check if moisture is below threshold for consecutive readings
-        stress_threshold = 30  # percent
-        consecutive_dry_days = 0
+        # Stressed when a dry run reaches the latest of the last 5 readings
+        recent = np.asarray(moisture_data[-5:], dtype=np.float64)
+        episodes = self.find_water_stress_episodes(recent)
+        
+        return bool(episodes) and episodes[-1]['endIndex'] == len(recent) - 1
+    
+    def find_water_stress_episodes(self, moisture, timestamps=None, min_readings=None):
+        """Every run of consecutive dry readings across a moisture series"""
+        min_readings = min_readings or self.WATER_STRESS_READINGS
+        moisture = np.asarray(moisture, dtype=np.float64)
         
-        for moisture in moisture_data[-5:]:  # Check last 5 readings
-            if moisture < stress_threshold:
-                consecutive_dry_days += 1
-            else:
-                consecutive_dry_days = 0
+        # Run boundaries are where the dry flag flips (NaN counts as not dry)
+        dry = moisture < self.WATER_STRESS_THRESHOLD
+        edges = np.diff(np.concatenate(([0], dry.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
         
-        return consecutive_dry_days >= 3
+        long_enough = (ends - starts) >= min_readings
+        starts = starts[long_enough]
+        ends = ends[long_enough]
+        
+        if not len(starts):
+            return []
+        
+        # Reduce over interleaved [start, end) boundaries and keep every other
+        # segment, so gaps and dropped short runs never reach a minimum; the
+        # +inf sentinel makes an end at the last reading a valid index
+        bounds = np.column_stack([starts, ends]).ravel()
+        minimums = np.minimum.reduceat(np.append(moisture, np.inf), bounds)[::2]
+        
+        episodes = []
+        for start, end, minimum in zip(starts.tolist(), ends.tolist(), minimums.tolist()):
+            episode = {
+                'startIndex': start,
+                'endIndex': end - 1,
+                'readings': end - start,
+                'minMoisture': round(minimum, 2)
+            }
+            
+            if timestamps is not None:
+                episode['start'] = timestamps[start]
+                episode['end'] = timestamps[end - 1]
+                episode['durationSeconds'] = (timestamps[end - 1] - timestamps[start]).total_seconds()
+            
+            episodes.append(episode)
+        
+        return episodes
     
     def assess_crop_health(self, conditions):
         # Calculate a health score based on multiple factors
-        moisture_score = min(1.0, conditions['moisture'] / 60)
-        temp_score = 1.0 - abs(conditions['temperature'] - 25) / 30  # Optimal around 25°C
-        nutrient_score = np.mean([
-            min(1.0, conditions['nitrogen'] / 100),
-            min(1.0, conditions['phosphorus'] / 50),
-            min(1.0, conditions['potassium'] / 150)
-        ])
+        return float(self.assess_crop_health_series(
+            {name: [value] for name, value in conditions.items()}
+        )[0])
+    
+    def assess_crop_health_series(self, conditions):
+        """Health score for every reading in columnar `conditions` in one pass"""
+        moisture_score = self._ratio(conditions['moisture'], 60)
+        temperature = np.asarray(conditions['temperature'], dtype=np.float64)
+        temp_score = 1.0 - np.abs(temperature - 25) / 30  # Optimal around 25°C
+        nutrient_score = self._nutrient_factor(conditions)
         
         health_score = (moisture_score * 0.4 + temp_score * 0.3 + nutrient_score * 0.3) * 100
         
-        return round(health_score, 2)
+        return np.round(health_score, 2)
+    
+    @staticmethod
+    def _ratio(values, optimum):
+        # Fraction of the optimum reached, capped at 1
+        return np.minimum(1.0, np.asarray(values, dtype=np.float64) / optimum)
+    
+    def _nutrient_factor(self, conditions):
+        return (
+            self._ratio(conditions['nitrogen'], 100)
+            + self._ratio(conditions['phosphorus'], 50)
+            + self._ratio(conditions['potassium'], 150)
+        ) / 3
     
     def generate_alerts(self, current_data, historical_data):
         alerts = []
@@ -67,25 +136,12 @@ class AnalyticsEngine:
             })
         
         # Nutrient deficiency alerts
-        if current_data['nitrogen'] < 30:
-            alerts.append({
-                'type': 'nutrient_deficiency',
-                'message': 'Nitrogen level low',
-                'severity': 'medium'
-            })
-        
-        if current_data['phosphorus'] < 15:
-            alerts.append({
-                'type': 'nutrient_deficiency',
-                'message': 'Phosphorus level low',
-                'severity': 'medium'
-            })
-        
-        if current_data['potassium'] < 50:
-            alerts.append({
-                'type': 'nutrient_deficiency',
-                'message': 'Potassium level low',
-                'severity': 'medium'
-            })
+        for nutrient, threshold, message in self.NUTRIENT_THRESHOLDS:
+            if current_data[nutrient] < threshold:
+                alerts.append({
+                    'type': 'nutrient_deficiency',
+                    'message': message,
+                    'severity': 'medium'
+                })
         
         return alerts
\ No newline at end of file
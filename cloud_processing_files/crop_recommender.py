@@ -1,13 +1,32 @@
-from catboost import CatBoostClassifier
 import numpy as np
-import pandas as pd
 import joblib
+import os
+from cloud_processing.tree_engine import CompiledTreeModel
+
+def artifact_version(model_path):
+    # Identify a model artifact by file name and modification time
+    if not model_path:
+        return 'untrained'
+    
+    return f'{os.path.basename(model_path)}@{int(os.path.getmtime(model_path))}'
 
 class CropRecommender:
-    def __init__(self, model_path=None):
-        if model_path:
-            self.model = joblib.load(model_path)
+    def __init__(self, model_path=None, mmap_mode='r', labels=None, model_version=None,
+                 feature_schema=None):
+        self.model_version = model_version or artifact_version(model_path)
+        
+        # The crop model only takes the six sensor readings
+        if feature_schema and len(feature_schema) != 6:
+            raise ValueError(f'Unsupported crop model feature_schema: {feature_schema}')
+        
+        if model_path and (model_path.endswith('.npz') or os.path.isdir(model_path)):
+            # Compiled tree tables from model_training_files/export_tree_model.py
+            self.model = CompiledTreeModel.load(model_path, mmap_mode)
+        elif model_path:
+            # Uncompressed joblib pickles memory-map their NumPy arrays
+            self.model = joblib.load(model_path, mmap_mode=mmap_mode)
         else:
+            from catboost import CatBoostClassifier
             self.model = CatBoostClassifier(verbose=0)
         
         # Crop labels (example)
@@ -16,23 +35,41 @@ class CropRecommender:
             'Chickpea', 'Kidney Beans', 'Pigeon Peas', 'Moth Beans',
             'Cotton', 'Sugarcane', 'Tobacco', 'Groundnut'
         ]
+        
+        # Registry metadata, else the loaded model itself, carries the label
+        # order the model was trained with
+        classes = labels if labels else (getattr(self.model, 'classes_', None) if model_path else None)
+        if classes is not None and len(classes):
+            self.crop_labels = [str(label) for label in classes]
     
     def train(self, X, y):
         self.model.fit(X, y)
         joblib.dump(self.model, 'crop_recommender_model.pkl')
     
     def recommend_crop(self, features):
-        prediction = self.model.predict(features)
-        probabilities = self.model.predict_proba(features)
-        
         # Get top 3 recommendations
-        top_3_idx = np.argsort(probabilities[0])[-3:][::-1]
-        recommendations = [
-            {
-                'crop': self.crop_labels[idx],
-                'probability': round(float(probabilities[0][idx]), 3)
-            }
-            for idx in top_3_idx
-        ]
+        return self.recommend_crops_batch(features, top_k=3)[0]
+    
+    def recommend_crops_batch(self, features, top_k=3):
+        # One predict_proba pass for every row
+        # float64 before rounding, so float32 leaf tables still give e.g. 0.268
+        probabilities = np.asarray(self.model.predict_proba(features), dtype=np.float64)
+        top_k = min(top_k, probabilities.shape[1])
+        
+        # Unordered top-k per row in O(n), then sort just those k columns
+        top_idx = np.argpartition(probabilities, -top_k, axis=1)[:, -top_k:]
+        top_probs = np.take_along_axis(probabilities, top_idx, axis=1)
+        order = np.argsort(-top_probs, axis=1, kind='stable')
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_probs = np.round(np.take_along_axis(top_probs, order, axis=1), 3)
         
-        return recommendations
\ No newline at end of file
+        return [
+            [
+                {
+                    'crop': self.crop_labels[idx],
+                    'probability': float(prob)
+                }
+                for idx, prob in zip(row_idx, row_probs)
+            ]
+            for row_idx, row_probs in zip(top_idx.tolist(), top_probs.tolist())
+        ]
\ No newline at end of file
@@ -1,29 +1,79 @@
 from datetime import datetime
-import pandas as pd
+import threading
 import numpy as np
 import json
-from sklearn.preprocessing import StandardScaler
+from cloud_processing.ring_buffer import SensorRingBuffer
 
 class DataProcessor:
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.sensor_data = pd.DataFrame(columns=[
-            'timestamp', 'moisture', 'temperature', 'humidity', 
-            'nitrogen', 'phosphorus', 'potassium', 'device_id'
-        ])
+    COLUMNS = [
+        'timestamp', 'moisture', 'temperature', 'humidity',
+        'nitrogen', 'phosphorus', 'potassium', 'device_id'
+    ]
+    
+    def __init__(self, capacity=2016, max_age=None):
+        self.scaler = None
+        
+        # One fixed-size ring buffer per device keeps memory flat
+        self.capacity = capacity
+        self.max_age = max_age
+        self.buffers = {}
+        self.sequence = 0
+        self.lock = threading.Lock()
+    
+    def process_batch(self, batch):
+        # Keep timestamps supplied by the device (buffered uploads)
+        now = datetime.utcnow().isoformat()
+        for data in batch:
+            if not data.get('timestamp'):
+                data['timestamp'] = now
+        
+        with self.lock:
+            for data in batch:
+                self._append(data)
+        
+        for data in batch:
+            self.save_to_database(data)
+        
+        return batch
     
-    def process_incoming_data(self, data):
-        # Add timestamp to data
-        data['timestamp'] = datetime.now().isoformat()
+    def _append(self, data):
+        device_id = data.get('device_id', 'unknown')
         
-        # Convert to DataFrame and append
-        new_row = pd.DataFrame([data])
-        self.sensor_data = pd.concat([self.sensor_data, new_row], ignore_index=True)
+        buffer = self.buffers.get(device_id)
+        if buffer is None:
+            buffer = SensorRingBuffer(self.capacity, self.max_age)
+            self.buffers[device_id] = buffer
+        
+        self.sequence += 1
+        buffer.append(datetime.fromisoformat(data['timestamp']), data, self.sequence)
+    
+    @property
+    def sensor_data(self):
+        # Fleet-wide DataFrame view, merged from the device buffers in arrival order
+        import pandas as pd
+        
+        with self.lock:
+            parts = [
+                (device_id,) + buffer.columns()
+                for device_id, buffer in self.buffers.items()
+            ]
+        
+        if not parts:
+            return pd.DataFrame(columns=self.COLUMNS)
+        
+        columns = {
+            column: np.concatenate([data[column] for _, data, _ in parts])
+            for column in self.COLUMNS if column != 'device_id'
+        }
+        columns['device_id'] = np.concatenate([
+            np.full(len(sequence), device_id, dtype=object)
+            for device_id, _, sequence in parts
+        ])
+        order = np.argsort(np.concatenate([sequence for _, _, sequence in parts]), kind='stable')
         
-        # Save to database (in real implementation)
-        self.save_to_database(data)
+        frame = pd.DataFrame({column: values[order] for column, values in columns.items()})
         
-        return data
+        return frame[self.COLUMNS]
     
     def save_to_database(self, data):
         # In real implementation, save to database
@@ -32,7 +82,7 @@ class DataProcessor:
     def prepare_features(self):
         # Prepare features for ML models
         features = self.sensor_data[[
-            'moisture', 'temperature', 'humidity', 
+            'moisture', 'temperature', 'humidity',
             'nitrogen', 'phosphorus', 'potassium'
         ]].copy()
         
@@ -45,6 +95,9 @@ class DataProcessor:
         features.fillna(features.mean(), inplace=True)
         
         # Scale features
+        if self.scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
         scaled_features = self.scaler.fit_transform(features)
         
         return scaled_features, features.columns.tolist()
\ No newline at end of file
@@ -1,14 +1,32 @@
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV
 import numpy as np
-import pandas as pd
 import joblib
+import os
+from cloud_processing.tree_engine import CompiledTreeModel
+from cloud_processing.crop_recommender import artifact_version
+
+SENSOR_FEATURES = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
+
+# One-hot crop columns, in the order pd.get_dummies used to produce them
+FERTILIZER_CROPS = ['Cotton', 'Maize', 'Rice', 'Sugarcane', 'Wheat']
 
 class FertilizerRecommender:
-    def __init__(self, model_path=None):
-        if model_path:
-            self.model = joblib.load(model_path)
+    def __init__(self, model_path=None, mmap_mode='r', labels=None, model_version=None,
+                 feature_schema=None):
+        self.model_version = model_version or artifact_version(model_path)
+        
+        # Column order the model was trained with; registry metadata records it
+        self.feature_schema = list(feature_schema or SENSOR_FEATURES + FERTILIZER_CROPS)
+        
+        if model_path and (model_path.endswith('.npz') or os.path.isdir(model_path)):
+            # Compiled tree tables from model_training_files/export_tree_model.py
+            self.model = CompiledTreeModel.load(model_path, mmap_mode)
+        elif model_path:
+            # Uncompressed joblib pickles memory-map their NumPy arrays
+            self.model = joblib.load(model_path, mmap_mode=mmap_mode)
         else:
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.model_selection import GridSearchCV
+            
             # Define parameter grid for GridSearchCV
             param_grid = {
                 'n_estimators': [50, 100, 200],
@@ -27,21 +45,56 @@ class FertilizerRecommender:
             'Urea', 'DAP', 'MOP', 'SSP', 'NPK 10-26-26',
             'NPK 12-32-16', 'Ammonium Sulfate', 'Calcium Nitrate'
         ]
+        
+        # Registry metadata, else the loaded model itself, carries the label
+        # order the model was trained with
+        classes = labels if labels else (getattr(self.model, 'classes_', None) if model_path else None)
+        if classes is not None and len(classes):
+            self.fertilizer_labels = [str(label) for label in classes]
     
     def train(self, X, y):
         self.model.fit(X, y)
         joblib.dump(self.model, 'fertilizer_recommender_model.pkl')
     
     def recommend_fertilizer(self, features, current_crop):
-        prediction = self.model.predict(features)
-        probabilities = self.model.predict_proba(features)
-        
         # Get top recommendation
-        top_idx = np.argmax(probabilities[0])
-        recommendation = {
-            'fertilizer': self.fertilizer_labels[top_idx],
-            'probability': round(float(probabilities[0][top_idx]), 3),
-            'crop': current_crop
-        }
-        
-        return recommendation
\ No newline at end of file
+        return self.recommend_fertilizer_batch(features, [current_crop])[0]
+    
+    def feature_matrix(self, features, crops):
+        """Sensor rows plus the one-hot crop, laid out in feature_schema order"""
+        X = np.asarray(features, dtype=np.float64).reshape(len(features), -1)
+        if X.shape[1] != len(SENSOR_FEATURES):
+            raise ValueError(f'Expected {len(SENSOR_FEATURES)} sensor features, got {X.shape[1]}')
+        
+        crops = np.asarray(crops, dtype=object)
+        columns = [
+            X[:, SENSOR_FEATURES.index(name)] if name in SENSOR_FEATURES
+            else (crops == name).astype(np.float64)
+            for name in self.feature_schema
+        ]
+        matrix = np.column_stack(columns)
+        
+        expected = getattr(self.model, 'n_features_in_', None)
+        if expected is not None and matrix.shape[1] != expected:
+            raise ValueError(f'Model expects {expected} features, feature_schema gives {matrix.shape[1]}')
+        
+        return matrix
+    
+    def recommend_fertilizer_batch(self, features, crops):
+        # One predict_proba pass for every row
+        # float64 before rounding, so float32 leaf tables still give e.g. 0.268
+        X = self.feature_matrix(features, crops)
+        probabilities = np.asarray(self.model.predict_proba(X), dtype=np.float64)
+        
+        rows = np.arange(len(probabilities))
+        top_idx = np.argmax(probabilities, axis=1)
+        top_probs = np.round(probabilities[rows, top_idx], 3)
+        
+        return [
+            {
+                'fertilizer': self.fertilizer_labels[idx],
+                'probability': float(prob),
+                'crop': crop
+            }
+            for idx, prob, crop in zip(top_idx.tolist(), top_probs.tolist(), crops)
+        ]
\ No newline at end of file
@@ -0,0 +1,143 @@
+from datetime import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Layout: <registry>/<model name>/<version>/{metadata.json, artifact}
+#         <registry>/<model name>/CURRENT   (name of the active version)
+
+def _write_atomic(path, content):
+    staging = path + '.tmp'
+    with open(staging, 'w') as f:
+        f.write(content)
+    os.replace(staging, path)
+
+def publish_model(registry_dir, name, artifact_path, metadata=None, activate=True):
+    """Copy a trained artifact into the registry as a new version"""
+    model_dir = os.path.join(registry_dir, name)
+    os.makedirs(model_dir, exist_ok=True)
+    
+    version = datetime.utcnow().strftime('v%Y%m%dT%H%M%S%f')
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir)
+    
+    artifact = os.path.basename(artifact_path.rstrip(os.sep))
+    if os.path.isdir(artifact_path):
+        shutil.copytree(artifact_path, os.path.join(version_dir, artifact))
+    else:
+        shutil.copy2(artifact_path, os.path.join(version_dir, artifact))
+    
+    metadata = dict(metadata or {})
+    metadata.update({
+        'name': name,
+        'version': version,
+        'artifact': artifact,
+        'created_at': datetime.utcnow().isoformat()
+    })
+    _write_atomic(os.path.join(version_dir, 'metadata.json'), json.dumps(metadata, indent=2))
+    
+    # The version is complete on disk before it can become current
+    if activate:
+        _write_atomic(os.path.join(model_dir, 'CURRENT'), version)
+    
+    return version
+
+class ModelRegistry:
+    def __init__(self, registry_dir):
+        self.registry_dir = registry_dir
+    
+    def current_version(self, name):
+        model_dir = os.path.join(self.registry_dir, name)
+        pointer = os.path.join(model_dir, 'CURRENT')
+        
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip() or None
+        
+        # Without a pointer, the newest published version wins
+        if not os.path.isdir(model_dir):
+            return None
+        
+        versions = sorted(
+            entry for entry in os.listdir(model_dir)
+            if os.path.exists(os.path.join(model_dir, entry, 'metadata.json'))
+        )
+        return versions[-1] if versions else None
+    
+    def load_metadata(self, name, version):
+        with open(os.path.join(self.registry_dir, name, version, 'metadata.json')) as f:
+            return json.load(f)
+    
+    def build_recommender(self, name, recommender_class, fallback_path=None, mmap_mode='r'):
+        # Use the registry's current version, or the configured path if empty
+        version = self.current_version(name)
+        
+        if version is None:
+            return recommender_class(fallback_path, mmap_mode)
+        
+        metadata = self.load_metadata(name, version)
+        artifact_path = os.path.join(self.registry_dir, name, version, metadata['artifact'])
+        
+        return recommender_class(
+            artifact_path,
+            mmap_mode,
+            labels=metadata.get('labels'),
+            model_version=f'{name}:{version}',
+            feature_schema=metadata.get('feature_schema')
+        )
+
+class ModelWatcher:
+    def __init__(self, registry, components, models, interval=30):
+        # models maps component name -> registry model name
+        self.registry = registry
+        self.components = components
+        self.models = models
+        self.interval = interval
+        self.stopped = threading.Event()
+    
+    def check(self):
+        swapped = []
+        
+        for component, name in self.models.items():
+            # Components that were never used will load the current version lazily
+            if not self.components.is_loaded(component):
+                continue
+            
+            version = self.registry.current_version(name)
+            current = self.components.get(component)
+            
+            if version is None or current.model_version == f'{name}:{version}':
+                continue
+            
+            try:
+                # Build the new instance fully before swapping it in; requests
+                # already holding the old instance finish with it
+                instance = self.components.factories[component]()
+            except Exception as e:
+                logger.error(f'Failed to load {name} {version}: {str(e)}')
+                continue
+            
+            self.components.replace(component, instance)
+            swapped.append(component)
+            logger.info(f'Swapped {component} to {instance.model_version}')
+        
+        return swapped
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f'Model registry check failed: {str(e)}')
+    
+    def start(self):
+        thread = threading.Thread(target=self.run, name='model-watcher', daemon=True)
+        thread.start()
+        return thread
+    
+    def stop(self):
+        self.stopped.set()
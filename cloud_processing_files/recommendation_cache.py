@@ -0,0 +1,86 @@
+from collections import OrderedDict
+import threading
+import time
+
+class RecommendationCache:
+    def __init__(self, maxsize=1024, ttl=300, quantization=0.5):
+        # LRU + TTL cache of recommender outputs keyed on quantized features
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.quantization = quantization
+        self.entries = OrderedDict()
+        self.last_results = {}
+        self.lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def make_key(self, kind, model_version, features, crop=None):
+        # Readings within the same quantization step share a cache entry
+        quantized = tuple(
+            None if value is None else int(round(value / self.quantization))
+            for value in features
+        )
+        return (kind, model_version, crop, quantized)
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def result_changed(self, history_key, result, load_previous=None):
+        # True when `result` differs from the last one recorded for history_key
+        with self.lock:
+            known = history_key in self.last_results
+            previous = self.last_results.get(history_key)
+        
+        if not known and load_previous is not None:
+            previous = load_previous()
+        
+        with self.lock:
+            self.last_results[history_key] = result
+        
+        return previous != result
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
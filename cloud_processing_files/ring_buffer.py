@@ -0,0 +1,74 @@
+from datetime import datetime
+import numpy as np
+
+class SensorRingBuffer:
+    COLUMNS = ['moisture', 'temperature', 'humidity', 'nitrogen', 'phosphorus', 'potassium']
+    
+    def __init__(self, capacity, max_age=None):
+        # Fixed-capacity columnar storage; the oldest row is overwritten once full
+        self.capacity = capacity
+        self.max_age = max_age
+        self.timestamps = np.empty(capacity, dtype='datetime64[us]')
+        self.sequence = np.zeros(capacity, dtype=np.int64)
+        self.values = {
+            column: np.full(capacity, np.nan, dtype=np.float64)
+            for column in self.COLUMNS
+        }
+        self.head = 0
+        self.size = 0
+    
+    def __len__(self):
+        return self.size
+    
+    def append(self, timestamp, reading, sequence):
+        position = self.head
+        
+        self.timestamps[position] = np.datetime64(timestamp, 'us')
+        self.sequence[position] = sequence
+        for column in self.COLUMNS:
+            value = reading.get(column)
+            self.values[column][position] = np.nan if value is None else value
+        
+        self.head = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+    
+    def indices(self):
+        # Storage positions of the retained rows, oldest first
+        start = (self.head - self.size) % self.capacity
+        positions = (start + np.arange(self.size)) % self.capacity
+        
+        if self.max_age is not None and self.size:
+            cutoff = np.datetime64(datetime.utcnow() - self.max_age, 'us')
+            positions = positions[self.timestamps[positions] >= cutoff]
+        
+        return positions
+    
+    def column(self, name):
+        positions = self.indices()
+        
+        if name == 'timestamp':
+            return self.timestamps[positions]
+        if name == 'sequence':
+            return self.sequence[positions]
+        
+        return self.values[name][positions]
+    
+    def tail(self, name, count):
+        # Last `count` values of a column without touching the rest of the buffer
+        positions = self.indices()[-count:] if self.max_age is not None else (
+            (self.head - np.arange(min(count, self.size), 0, -1)) % self.capacity
+        )
+        
+        if name == 'timestamp':
+            return self.timestamps[positions]
+        
+        return self.values[name][positions]
+    
+    def columns(self):
+        positions = self.indices()
+        
+        data = {'timestamp': self.timestamps[positions]}
+        for column in self.COLUMNS:
+            data[column] = self.values[column][positions]
+        
+        return data, self.sequence[positions]
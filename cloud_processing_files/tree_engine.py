@@ -0,0 +1,116 @@
+import json
+import os
+import numpy as np
+
+# Scalars stored in model.json rather than as arrays
+SCALAR_FIELDS = ['kind', 'max_depth', 'scale']
+
+class CompiledTreeModel:
+    # Array-based tree ensemble evaluated with NumPy only (no sklearn/catboost)
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.classes_ = np.asarray(arrays['classes'])
+        self.arrays = arrays
+    
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        if not os.path.isdir(path):
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            return cls(arrays)
+        
+        # Directory layout: one raw .npy per array, memory-mapped read-only so
+        # every worker process shares the same page-cache copy
+        with open(os.path.join(path, 'model.json')) as f:
+            arrays = json.load(f)
+        
+        for name in os.listdir(path):
+            if name.endswith('.npy'):
+                arrays[name[:-4]] = np.load(
+                    os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False
+                )
+        
+        return cls(arrays)
+    
+    @staticmethod
+    def save(arrays, path):
+        # Write into a sibling directory first, then swap it into place
+        staging = path.rstrip(os.sep) + '.tmp'
+        os.makedirs(staging, exist_ok=True)
+        
+        scalars = {}
+        for name, value in arrays.items():
+            if name in SCALAR_FIELDS:
+                scalars[name] = np.asarray(value).item()
+            else:
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(value))
+        
+        with open(os.path.join(staging, 'model.json'), 'w') as f:
+            json.dump(scalars, f)
+        
+        if os.path.isdir(path):
+            previous = path.rstrip(os.sep) + '.old'
+            os.replace(path, previous)
+            os.replace(staging, path)
+            for name in os.listdir(previous):
+                os.remove(os.path.join(previous, name))
+            os.rmdir(previous)
+        else:
+            os.replace(staging, path)
+    
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        
+        if self.kind == 'forest':
+            return self._forest_proba(X)
+        
+        return self._oblivious_proba(X)
+    
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+    
+    def _forest_proba(self, X):
+        # Walk every tree for every row at once, one depth level per step.
+        # Leaves point to themselves, so finished paths simply stay put.
+        feature = self.arrays['feature']
+        threshold = self.arrays['threshold']
+        left = self.arrays['left']
+        right = self.arrays['right']
+        value = self.arrays['value']
+        
+        n_trees = feature.shape[0]
+        trees = np.arange(n_trees)[:, None]
+        rows = np.arange(len(X))[None, :]
+        node = np.zeros((n_trees, len(X)), dtype=np.intp)
+        
+        for _ in range(int(self.arrays['max_depth'])):
+            go_left = X[rows, feature[trees, node]] <= threshold[trees, node]
+            node = np.where(go_left, left[trees, node], right[trees, node])
+        
+        return value[trees, node].mean(axis=0)
+    
+    def _oblivious_proba(self, X):
+        # Oblivious trees share one split per level, so the leaf index is
+        # just the bit pattern of the level comparisons
+        split_features = self.arrays['split_features']
+        borders = self.arrays['borders']
+        leaf_values = self.arrays['leaf_values']
+        scale = float(self.arrays['scale'])
+        bias = self.arrays['bias']
+        
+        depth = split_features.shape[1]
+        bits = X[:, split_features] > borders
+        leaf_index = (bits.astype(np.intp) << np.arange(depth)).sum(axis=2)
+        
+        raw = leaf_values[np.arange(len(split_features))[None, :], leaf_index].sum(axis=1)
+        raw = raw * scale + bias
+        
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        
+        raw -= raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
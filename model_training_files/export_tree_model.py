@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+import joblib
+from cloud_processing.tree_engine import CompiledTreeModel
+
+# Flatten trained tree ensembles into plain arrays for CompiledTreeModel
+
+def unwrap_estimator(model):
+    # GridSearchCV / pipelines carry the fitted forest in best_estimator_
+    return getattr(model, 'best_estimator_', model)
+
+def compile_random_forest(model):
+    forest = unwrap_estimator(model)
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    
+    n_trees = len(trees)
+    n_nodes = max(tree.node_count for tree in trees)
+    n_classes = len(forest.classes_)
+    
+    feature = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    threshold = np.zeros((n_trees, n_nodes), dtype=np.float64)
+    left = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    right = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    value = np.zeros((n_trees, n_nodes, n_classes), dtype=np.float32)
+    
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        nodes = np.arange(count)
+        is_leaf = tree.children_left == -1
+        
+        feature[t, :count] = np.where(is_leaf, 0, tree.feature)
+        threshold[t, :count] = tree.threshold
+        left[t, :count] = np.where(is_leaf, nodes, tree.children_left)
+        right[t, :count] = np.where(is_leaf, nodes, tree.children_right)
+        
+        # Per-node class distribution, normalized like predict_proba does
+        counts = tree.value[:, 0, :]
+        totals = counts.sum(axis=1, keepdims=True)
+        value[t, :count] = counts / np.where(totals == 0, 1, totals)
+    
+    return {
+        'kind': np.array('forest'),
+        'classes': np.asarray(forest.classes_).astype(str),
+        'feature': feature,
+        'threshold': threshold,
+        'left': left,
+        'right': right,
+        'value': value,
+        'max_depth': np.array(max(tree.max_depth for tree in trees))
+    }
+
+def compile_catboost(model):
+    # CatBoost's JSON export lists every oblivious tree with its splits and leaves
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.json')
+        model.save_model(path, format='json')
+        with open(path) as f:
+            exported = json.load(f)
+    
+    trees = exported['oblivious_trees']
+    scale, bias = exported.get('scale_and_bias', [1.0, [0.0]])
+    n_dims = len(bias) if isinstance(bias, list) else 1
+    depth = max(len(tree['splits']) for tree in trees)
+    
+    # Shallower trees are padded with never-taken splits (border = +inf)
+    split_features = np.zeros((len(trees), depth), dtype=np.int32)
+    borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((len(trees), 2 ** depth, n_dims), dtype=np.float64)
+    
+    for t, tree in enumerate(trees):
+        for level, split in enumerate(tree['splits']):
+            if split.get('split_type', 'FloatFeature') != 'FloatFeature':
+                raise ValueError('Only numeric float-feature splits can be compiled')
+            split_features[t, level] = split['float_feature_index']
+            borders[t, level] = split['border']
+        
+        values = np.asarray(tree['leaf_values'], dtype=np.float64).reshape(-1, n_dims)
+        leaf_values[t, :len(values)] = values
+    
+    return {
+        'kind': np.array('oblivious'),
+        'classes': np.asarray(model.classes_).astype(str),
+        'split_features': split_features,
+        'borders': borders,
+        'leaf_values': leaf_values,
+        'scale': np.array(scale, dtype=np.float64),
+        'bias': np.asarray(bias if isinstance(bias, list) else [bias], dtype=np.float64)
+    }
+
+def compile_model(model):
+    estimator = unwrap_estimator(model)
+    
+    if hasattr(estimator, 'estimators_'):
+        return compile_random_forest(estimator)
+    if type(estimator).__name__.startswith('CatBoost'):
+        return compile_catboost(estimator)
+    
+    raise TypeError(f'Cannot compile model of type {type(estimator).__name__}')
+
+def export_compiled_model(model, path, X_check=None, tolerance=1e-4):
+    """Compile `model`, verify it against the original on X_check and save it"""
+    arrays = compile_model(model)
+    compiled = CompiledTreeModel(arrays)
+    
+    if X_check is not None:
+        expected = np.asarray(model.predict_proba(X_check))
+        actual = compiled.predict_proba(np.asarray(X_check, dtype=np.float64))
+        error = float(np.abs(expected - actual).max())
+        
+        if error > tolerance:
+            raise ValueError(f'Compiled model deviates from the original (max error {error:.2e})')
+    
+    if path.endswith('.npz'):
+        np.savez(path, **arrays)
+    else:
+        CompiledTreeModel.save(arrays, path)
+    
+    return compiled
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python export_tree_model.py <model.pkl> <compiled dir or .npz>")
+        sys.exit(1)
+    
+    export_compiled_model(joblib.load(sys.argv[1]), sys.argv[2])
+    print(f"Compiled model saved as {sys.argv[2]}")
@@ -0,0 +1,223 @@
+import hashlib
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+# Parallel, resumable replacement for GridSearchCV. Every finished
+# (candidate, fold, resource) fit is appended to a JSONL checkpoint, so an
+# interrupted search only re-runs the fits that never completed. The first
+# line fingerprints the data and search settings; a checkpoint written for
+# different data or a different grid is discarded rather than reused.
+
+# Training data shared with worker processes once, not pickled per task
+_worker_data = {}
+
+def _init_worker(X, y):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+def _fit_and_score(estimator, params, train_index, test_index):
+    X = _worker_data['X']
+    y = _worker_data['y']
+    
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_index], y[train_index])
+    return float(model.score(X[test_index], y[test_index]))
+
+def parameter_grid(param_grid):
+    names = sorted(param_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(param_grid[name] for name in names))
+    ]
+
+def candidate_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def load_checkpoint(path, fingerprint):
+    """Scores recorded for `fingerprint`, or None when there is no usable checkpoint"""
+    if not path or not os.path.exists(path):
+        return None
+    
+    scores = {}
+    with open(path) as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        if header.get('fingerprint') != fingerprint:
+            return None
+        
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            scores[(record['candidate'], record['fold'], record['resource'])] = record['score']
+    
+    return scores
+
+class HyperparameterSearch:
+    def __init__(self, estimator, param_grid, cv=5, mode='grid', n_jobs=None,
+                 checkpoint_path=None, factor=3, min_resources=None, random_state=42):
+        if mode not in ('grid', 'halving'):
+            raise ValueError(f'Unknown search mode: {mode}')
+        
+        self.estimator = estimator
+        self.candidates = parameter_grid(param_grid)
+        self.cv = cv
+        self.mode = mode
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.checkpoint_path = checkpoint_path
+        self.factor = factor
+        self.min_resources = min_resources
+        self.random_state = random_state
+        
+        self.results = []
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_estimator_ = None
+    
+    def _splits(self, y, resource):
+        # Fixed seeds so resumed runs produce the same folds and subsamples
+        rng = np.random.RandomState(self.random_state)
+        subset = np.sort(rng.permutation(len(y))[:resource])
+        
+        folds = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        return [
+            (subset[train], subset[test])
+            for train, test in folds.split(np.zeros(len(subset)), y[subset])
+        ]
+    
+    def _run_round(self, pool, candidates, y, resource, scores, checkpoint):
+        splits = self._splits(y, resource)
+        futures = {}
+        
+        for params in candidates:
+            key = candidate_key(params)
+            for fold, (train_index, test_index) in enumerate(splits):
+                if (key, fold, resource) in scores:
+                    continue
+                future = pool.submit(_fit_and_score, self.estimator, params, train_index, test_index)
+                futures[future] = (key, fold)
+        
+        for future in as_completed(futures):
+            key, fold = futures[future]
+            score = future.result()
+            scores[(key, fold, resource)] = score
+            
+            if checkpoint is not None:
+                checkpoint.write(json.dumps({
+                    'candidate': key,
+                    'fold': fold,
+                    'resource': resource,
+                    'score': score
+                }) + '\n')
+                checkpoint.flush()
+        
+        ranked = []
+        for params in candidates:
+            key = candidate_key(params)
+            fold_scores = [scores[(key, fold, resource)] for fold in range(len(splits))]
+            ranked.append({
+                'params': params,
+                'resource': resource,
+                'mean_score': float(np.mean(fold_scores)),
+                'std_score': float(np.std(fold_scores))
+            })
+        
+        ranked.sort(key=lambda result: result['mean_score'], reverse=True)
+        return ranked
+    
+    def _schedule(self, n_samples):
+        # Training rows per round; grid search is a single round on all of them
+        if self.mode == 'grid':
+            return [n_samples]
+        
+        n_rounds = max(1, math.ceil(math.log(len(self.candidates), self.factor)) + 1)
+        min_resources = self.min_resources or max(
+            self.cv * 2, n_samples // self.factor ** (n_rounds - 1)
+        )
+        
+        return [
+            min(n_samples, min_resources * self.factor ** i)
+            for i in range(n_rounds)
+        ]
+    
+    def fingerprint(self, X, y):
+        """Hash of the training data and everything that decides the folds and fits"""
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(X).tobytes())
+        digest.update('\n'.join(map(str, y.tolist())).encode('utf-8'))
+        digest.update(json.dumps({
+            'estimator': repr(self.estimator),
+            'candidates': self.candidates,
+            'cv': self.cv,
+            'mode': self.mode,
+            'factor': self.factor,
+            'min_resources': self.min_resources,
+            'random_state': self.random_state
+        }, sort_keys=True, default=str).encode('utf-8'))
+        
+        return digest.hexdigest()
+    
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y)
+        
+        checkpoint = None
+        scores = {}
+        if self.checkpoint_path:
+            fingerprint = self.fingerprint(X, y)
+            recorded = load_checkpoint(self.checkpoint_path, fingerprint)
+            
+            if recorded is None:
+                checkpoint = open(self.checkpoint_path, 'w')
+                checkpoint.write(json.dumps({'fingerprint': fingerprint}) + '\n')
+                checkpoint.flush()
+            else:
+                scores = recorded
+                checkpoint = open(self.checkpoint_path, 'a')
+        candidates = self.candidates
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.n_jobs, initializer=_init_worker, initargs=(X, y)
+            ) as pool:
+                for resource in self._schedule(len(y)):
+                    ranked = self._run_round(pool, candidates, y, resource, scores, checkpoint)
+                    self.results.extend(ranked)
+                    
+                    # Successive halving: only the best 1/factor move on to more data
+                    keep = max(1, math.ceil(len(ranked) / self.factor))
+                    candidates = [result['params'] for result in ranked[:keep]]
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        
+        self.best_params_ = ranked[0]['params']
+        self.best_score_ = ranked[0]['mean_score']
+        
+        # Refit the winner on all the data, using every core for the trees
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        if 'n_jobs' in self.best_estimator_.get_params():
+            self.best_estimator_.set_params(n_jobs=-1)
+        self.best_estimator_.fit(X, y)
+        
+        return self
+    
+    @property
+    def classes_(self):
+        return self.best_estimator_.classes_
+    
+    def predict(self, X):
+        return self.best_estimator_.predict(np.asarray(X, dtype=np.float32))
+    
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(np.asarray(X, dtype=np.float32))
@@ -1,9 +1,22 @@
 import pandas as pd
 import numpy as np
 from catboost import CatBoostClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
+import argparse
 import joblib
+import os
+from export_tree_model import export_compiled_model
+from training_data import (
+    FEATURE_COLUMNS, ReservoirSample, add_source_arguments, chunk_from_frame,
+    feature_matrix, is_holdout, iter_training_chunks
+)
+from cloud_processing.model_registry import publish_model
+
+CROP_LABELS = [
+    'Wheat', 'Rice', 'Maize', 'Barley', 'Pearl Millet', 
+    'Chickpea', 'Kidney Beans', 'Pigeon Peas', 'Moth Beans',
+    'Cotton', 'Sugarcane', 'Tobacco', 'Groundnut'
+]
 
 # Load and prepare dataset (example)
 def load_crop_data():
@@ -16,42 +29,78 @@ def load_crop_data():
         'nitrogen': np.random.randint(10, 200, 1000),
         'phosphorus': np.random.randint(5, 150, 1000),
         'potassium': np.random.randint(20, 300, 1000),
-        'crop': np.random.choice([
-            'Wheat', 'Rice', 'Maize', 'Barley', 'Pearl Millet', 
-            'Chickpea', 'Kidney Beans', 'Pigeon Peas', 'Moth Beans',
-            'Cotton', 'Sugarcane', 'Tobacco', 'Groundnut'
-        ], 1000)
+        'crop': np.random.choice(CROP_LABELS, 1000)
     }
     
     return pd.DataFrame(data)
 
-def train_crop_model():
-    # Load data
-    df = load_crop_data()
+def train_crop_model(source='database', path=None, database_url=None,
+                     chunk_size=50000, iterations_per_chunk=100, holdout_size=100000):
+    if source == 'sample':
+        chunks = [chunk_from_frame(load_crop_data(), 'crop')]
+    else:
+        chunks = iter_training_chunks('crop', source, path, database_url, chunk_size)
     
-    # Prepare features and target
-    X = df.drop('crop', axis=1)
-    y = df['crop']
+    # Each chunk adds trees on top of the model so far, so the full history
+    # never has to be in memory at once
+    model = None
+    holdout = ReservoirSample(holdout_size)
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    for chunk in chunks:
+        X = feature_matrix(chunk)
+        y = chunk['labels']
+        test = is_holdout(chunk['ids'])
+        
+        holdout.add(X[test], y[test])
+        if not (~test).any():
+            continue
+        
+        chunk_model = CatBoostClassifier(
+            iterations=iterations_per_chunk, class_names=CROP_LABELS, verbose=0
+        )
+        chunk_model.fit(X[~test], y[~test], init_model=model)
+        model = chunk_model
     
-    # Train model
-    model = CatBoostClassifier(verbose=0)
-    model.fit(X_train, y_train)
+    if model is None:
+        raise ValueError('No labeled crop rows were found for training')
     
     # Evaluate model
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+    X_test, y_test = holdout.arrays()
+    y_pred = model.predict(X_test).ravel()
+    accuracy = accuracy_score(y_test.astype(str), y_pred.astype(str))
     print(f"Model accuracy: {accuracy:.2f}")
     
     # Save model
     joblib.dump(model, 'crop_recommender_model.pkl')
     print("Model saved as crop_recommender_model.pkl")
     
+    # Save a compiled, NumPy-only copy that workers memory-map
+    export_compiled_model(model, 'crop_recommender_model.trees', X_test)
+    print("Compiled model saved as crop_recommender_model.trees")
+    
+    # Publish the compiled model so running servers pick it up
+    version = publish_model(
+        os.environ.get('MODEL_REGISTRY_DIR', 'models/registry'),
+        'crop_recommender',
+        'crop_recommender_model.trees',
+        {
+            'feature_schema': FEATURE_COLUMNS,
+            'labels': [str(label) for label in model.classes_],
+            'metrics': {'accuracy': float(accuracy)}
+        }
+    )
+    print(f"Published crop_recommender version {version}")
+    
     return model
 
 if __name__ == "__main__":
-    train_crop_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the crop recommender')
+    add_source_arguments(parser)
+    parser.add_argument('--iterations-per-chunk', type=int, default=100,
+                        help='boosting rounds added for each chunk')
+    args = parser.parse_args()
+    
+    train_crop_model(
+        args.source, args.parquet, args.database_url,
+        args.chunk_size, args.iterations_per_chunk
+    )
\ No newline at end of file
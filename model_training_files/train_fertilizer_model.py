@@ -1,9 +1,18 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import accuracy_score
+import argparse
 import joblib
+import os
+from export_tree_model import export_compiled_model
+from hyperparameter_search import HyperparameterSearch
+from training_data import (
+    FEATURE_COLUMNS, ReservoirSample, add_source_arguments, chunk_from_frame,
+    feature_matrix, is_holdout, iter_training_chunks
+)
+from cloud_processing.model_registry import publish_model
+from cloud_processing.fertilizer_recommender import FERTILIZER_CROPS
 
 # Load and prepare dataset (example)
 def load_fertilizer_data():
@@ -16,9 +25,7 @@ def load_fertilizer_data():
         'nitrogen': np.random.randint(10, 200, 1000),
         'phosphorus': np.random.randint(5, 150, 1000),
         'potassium': np.random.randint(20, 300, 1000),
-        'crop': np.random.choice([
-            'Wheat', 'Rice', 'Maize', 'Cotton', 'Sugarcane'
-        ], 1000),
+        'crop': np.random.choice(FERTILIZER_CROPS, 1000),
         'fertilizer': np.random.choice([
             'Urea', 'DAP', 'MOP', 'SSP', 'NPK 10-26-26',
             'NPK 12-32-16', 'Ammonium Sulfate', 'Calcium Nitrate'
@@ -27,35 +34,49 @@ def load_fertilizer_data():
     
     return pd.DataFrame(data)
 
-def train_fertilizer_model():
-    # Load data
-    df = load_fertilizer_data()
+def train_fertilizer_model(search_mode='grid', n_jobs=None, checkpoint_path=None,
+                           source='database', path=None, database_url=None,
+                           chunk_size=50000, sample_size=200000):
+    if source == 'sample':
+        chunks = [chunk_from_frame(load_fertilizer_data(), 'fertilizer', 'crop')]
+    else:
+        chunks = iter_training_chunks('fertilizer', source, path, database_url, chunk_size)
     
-    # Prepare features and target
-    X = df.drop(['fertilizer', 'crop'], axis=1)
-    y = df['fertilizer']
+    # Random forests cannot grow incrementally across chunks with differing
+    # label sets, so stream the history into fixed-size uniform samples
+    train_sample = ReservoirSample(sample_size)
+    test_sample = ReservoirSample(sample_size // 4)
     
-    # Add crop as a feature (one-hot encoding)
-    X = pd.concat([X, pd.get_dummies(df['crop'])], axis=1)
+    for chunk in chunks:
+        # Sensor features plus the crop as one-hot columns
+        X = feature_matrix(chunk, FERTILIZER_CROPS)
+        y = chunk['labels']
+        test = is_holdout(chunk['ids'])
+        
+        train_sample.add(X[~test], y[~test])
+        test_sample.add(X[test], y[test])
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    X_train, y_train = train_sample.arrays()
+    X_test, y_test = test_sample.arrays()
+    y_train = y_train.astype(str)
+    y_test = y_test.astype(str)
     
-    # Define parameter grid for GridSearchCV
+    # Define parameter grid for the hyperparameter search
     param_grid = {
         'n_estimators': [50, 100, 200],
         'max_depth': [None, 10, 20],
         'min_samples_split': [2, 5, 10]
     }
     
-    # Train model with GridSearchCV
-    model = GridSearchCV(
-        RandomForestClassifier(), 
-        param_grid, 
-        cv=5, 
-        scoring='accuracy'
+    # Candidates and folds run in parallel; finished fits are checkpointed
+    # so an interrupted search resumes where it stopped
+    model = HyperparameterSearch(
+        RandomForestClassifier(n_jobs=1),
+        param_grid,
+        cv=5,
+        mode=search_mode,
+        n_jobs=n_jobs,
+        checkpoint_path=checkpoint_path
     )
     model.fit(X_train, y_train)
     
@@ -65,11 +86,44 @@ def train_fertilizer_model():
     print(f"Model accuracy: {accuracy:.2f}")
     print(f"Best parameters: {model.best_params_}")
     
-    # Save model
-    joblib.dump(model, 'fertilizer_recommender_model.pkl')
+    # Save the refit forest itself; the search wrapper is training-only code
+    joblib.dump(model.best_estimator_, 'fertilizer_recommender_model.pkl')
     print("Model saved as fertilizer_recommender_model.pkl")
     
+    # Save a compiled, NumPy-only copy that workers memory-map
+    export_compiled_model(model, 'fertilizer_recommender_model.trees', X_test)
+    print("Compiled model saved as fertilizer_recommender_model.trees")
+    
+    # Publish the compiled model so running servers pick it up
+    version = publish_model(
+        os.environ.get('MODEL_REGISTRY_DIR', 'models/registry'),
+        'fertilizer_recommender',
+        'fertilizer_recommender_model.trees',
+        {
+            'feature_schema': FEATURE_COLUMNS + FERTILIZER_CROPS,
+            'labels': [str(label) for label in model.classes_],
+            'metrics': {'accuracy': float(accuracy)}
+        }
+    )
+    print(f"Published fertilizer_recommender version {version}")
+    
     return model
 
 if __name__ == "__main__":
-    train_fertilizer_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the fertilizer recommender')
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid',
+                        help='exhaustive grid or successive halving')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--checkpoint', default=None,
+                        help='JSONL file of finished fits, used to resume (e.g. fertilizer_search.jsonl)')
+    add_source_arguments(parser)
+    parser.add_argument('--sample-size', type=int, default=200000,
+                        help='training rows kept from the streamed history')
+    args = parser.parse_args()
+    
+    train_fertilizer_model(
+        args.search, args.jobs, args.checkpoint,
+        args.source, args.parquet, args.database_url,
+        args.chunk_size, args.sample_size
+    )
\ No newline at end of file
@@ -0,0 +1,231 @@
+import json
+import os
+import numpy as np
+from sqlalchemy import create_engine, text
+
+# Streaming loaders for labeled training rows. Each chunk holds typed
+# column arrays, so memory is bounded by the chunk size rather than by the
+# length of the fleet history.
+
+FEATURE_DTYPES = [
+    ('moisture', np.float32),
+    ('temperature', np.float32),
+    ('humidity', np.float32),
+    ('nitrogen', np.int16),
+    ('phosphorus', np.int16),
+    ('potassium', np.int16)
+]
+FEATURE_COLUMNS = [name for name, _ in FEATURE_DTYPES]
+
+DEFAULT_DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///sensor_data.db'
+
+# Recommendations are paired with the reading they were made from
+LABELED_ROWS_QUERY = text(f"""
+    SELECT s.id, {', '.join('s.' + name for name in FEATURE_COLUMNS)}, r.data
+    FROM recommendations r
+    JOIN sensor_data s ON s.id = r.sensor_data_id
+    WHERE r.recommendation_type = :recommendation_type
+    ORDER BY r.id
+""")
+
+RECOMMENDATION_LABELS_QUERY = text("""
+    SELECT sensor_data_id, data
+    FROM recommendations
+    WHERE recommendation_type = :recommendation_type AND sensor_data_id IS NOT NULL
+""")
+
+def label_from_recommendation(recommendation_type, data):
+    """Return (label, crop) stored in a recommendation's data column"""
+    if isinstance(data, str):
+        data = json.loads(data)
+    if not data:
+        return None, None
+    
+    if recommendation_type == 'crop':
+        ranked = data.get('recommendations') or []
+        return (ranked[0]['crop'], None) if ranked else (None, None)
+    
+    recommendation = data.get('recommendation') or {}
+    return recommendation.get('fertilizer'), recommendation.get('crop')
+
+def _make_chunk(ids, columns, labels, crops=None):
+    # NULL metrics arrive as None/NaN; drop those rows before the int16 downcast
+    values = {name: np.asarray(columns[name], dtype=np.float64) for name in FEATURE_COLUMNS}
+    keep = np.array([label is not None for label in labels], dtype=bool)
+    for name in FEATURE_COLUMNS:
+        keep &= np.isfinite(values[name])
+    
+    return {
+        'ids': np.asarray(ids, dtype=np.int64)[keep],
+        'features': {
+            name: values[name][keep].astype(dtype)
+            for name, dtype in FEATURE_DTYPES
+        },
+        'labels': np.asarray(labels, dtype=object)[keep],
+        'crops': None if crops is None else np.asarray(crops, dtype=object)[keep]
+    }
+
+def iter_database_chunks(recommendation_type, database_url=None, chunk_size=50000):
+    """Stream labeled rows from the sensor_data/recommendations tables"""
+    engine = create_engine(database_url or DEFAULT_DATABASE_URL)
+    
+    with engine.connect() as connection:
+        # Server-side cursor: rows arrive chunk by chunk instead of all at once
+        result = connection.execution_options(stream_results=True).execute(
+            LABELED_ROWS_QUERY, {'recommendation_type': recommendation_type}
+        )
+        
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            
+            values = list(zip(*rows))
+            columns = dict(zip(FEATURE_COLUMNS, values[1:-1]))
+            labels, crops = zip(*(
+                label_from_recommendation(recommendation_type, data) for data in values[-1]
+            ))
+            
+            yield _make_chunk(
+                values[0], columns, labels,
+                crops if recommendation_type == 'fertilizer' else None
+            )
+    
+    engine.dispose()
+
+def load_recommendation_labels(recommendation_type, database_url=None):
+    """Map sensor_data id -> (label, crop) from the recommendations table"""
+    engine = create_engine(database_url or DEFAULT_DATABASE_URL)
+    
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(
+            RECOMMENDATION_LABELS_QUERY, {'recommendation_type': recommendation_type}
+        )
+        labels = {
+            sensor_data_id: label_from_recommendation(recommendation_type, data)
+            for sensor_data_id, data in result
+        }
+    
+    engine.dispose()
+    return labels
+
+def iter_parquet_chunks(path, label_column, crop_column=None, chunk_size=50000, database_url=None):
+    """Stream labeled rows from a Parquet file or partitioned directory"""
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise RuntimeError('pyarrow is required to train from Parquet files')
+    
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    
+    # Labeled exports carry their own label columns. The retention archive
+    # (retention.compact_sensor_data) holds readings only, so its rows are
+    # labeled by the recommendations that reference their sensor_data id.
+    joined = None
+    if label_column not in dataset.schema.names:
+        joined = load_recommendation_labels(label_column, database_url)
+    
+    columns = ['id'] + FEATURE_COLUMNS
+    if joined is None:
+        columns.append(label_column)
+        if crop_column:
+            columns.append(crop_column)
+    
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        data = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in columns}
+        
+        if joined is None:
+            labels = data[label_column]
+            crops = data[crop_column] if crop_column else None
+        else:
+            pairs = [joined.get(row_id, (None, None)) for row_id in data['id'].tolist()]
+            labels = [label for label, _ in pairs]
+            crops = [crop for _, crop in pairs] if crop_column else None
+        
+        yield _make_chunk(data['id'], data, labels, crops)
+
+def iter_training_chunks(recommendation_type, source='database', path=None,
+                         database_url=None, chunk_size=50000):
+    """Labeled chunks for `recommendation_type` ('crop' or 'fertilizer')"""
+    if source == 'database':
+        return iter_database_chunks(recommendation_type, database_url, chunk_size)
+    
+    if source == 'parquet':
+        crop_column = 'crop' if recommendation_type == 'fertilizer' else None
+        return iter_parquet_chunks(path, recommendation_type, crop_column, chunk_size, database_url)
+    
+    raise ValueError(f'Unknown training data source: {source}')
+
+def add_source_arguments(parser):
+    parser.add_argument('--source', choices=['database', 'parquet', 'sample'], default='database',
+                        help='where labeled rows come from')
+    parser.add_argument('--parquet', default=None,
+                        help='Parquet file or directory (with --source parquet); files without '
+                             'label columns, like the retention archive, are labeled from the database')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to DATABASE_URL or the local SQLite file')
+    parser.add_argument('--chunk-size', type=int, default=50000,
+                        help='rows read per chunk')
+
+def chunk_from_frame(df, label_column, crop_column=None):
+    """Wrap an in-memory DataFrame (e.g. sample data) as a single chunk"""
+    return _make_chunk(
+        np.arange(len(df)),
+        {name: df[name].to_numpy() for name in FEATURE_COLUMNS},
+        df[label_column].to_numpy(),
+        df[crop_column].to_numpy() if crop_column else None
+    )
+
+def feature_matrix(chunk, crop_categories=None):
+    """Stack a chunk's typed columns into a float32 matrix for the estimators"""
+    X = np.column_stack([chunk['features'][name] for name in FEATURE_COLUMNS]).astype(np.float32)
+    
+    if crop_categories is None:
+        return X
+    
+    # Fixed category order keeps one-hot columns identical across chunks
+    one_hot = chunk['crops'][:, None] == np.asarray(crop_categories, dtype=object)[None, :]
+    return np.hstack([X, one_hot.astype(np.float32)])
+
+def is_holdout(ids, fraction=0.2):
+    # Deterministic by row id, so a chunked run holds out the same rows every time
+    return (ids % 100) < int(fraction * 100)
+
+class ReservoirSample:
+    """Uniform fixed-size sample of a stream of (X, y) chunks"""
+    
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.seen = 0
+        self.filled = 0
+        self.X = None
+        self.y = None
+    
+    def add(self, X, y):
+        if self.X is None:
+            self.X = np.empty((self.size, X.shape[1]), dtype=X.dtype)
+            self.y = np.empty(self.size, dtype=object)
+        
+        # Fill the reservoir first, then replace entries with falling probability
+        fill = min(len(X), self.size - self.filled)
+        self.X[self.filled:self.filled + fill] = X[:fill]
+        self.y[self.filled:self.filled + fill] = y[:fill]
+        self.filled += fill
+        self.seen += fill
+        
+        rest = len(X) - fill
+        if rest:
+            positions = np.arange(self.seen, self.seen + rest)
+            slots = (self.rng.random(rest) * (positions + 1)).astype(np.int64)
+            chosen = slots < self.size
+            
+            self.X[slots[chosen]] = X[fill:][chosen]
+            self.y[slots[chosen]] = y[fill:][chosen]
+            self.seen += rest
+    
+    def arrays(self):
+        if not self.filled:
+            raise ValueError('No labeled rows were found for training')
+        
+        return self.X[:self.filled], self.y[:self.filled]
@@ -1,14 +1,93 @@
 // Global variables
+const API_BASE = 'http://localhost:5000/api';
+const POLL_INTERVAL = 300000; // 5 minutes
+const MAX_CHART_POINTS = 2000;
 let sensorData = [];
 let charts = {};
+let activeAlerts = [];
+let pollTimer = null;
+let lastRecommendationFetch = 0;
 
 // Initialize the dashboard
 document.addEventListener('DOMContentLoaded', function() {
     initializeCharts();
-    fetchData();
-    setInterval(fetchData, 300000); // Update every 5 minutes
+    
+    // Server-Sent Events push new data as it arrives; poll only without them
+    if (window.EventSource) {
+        startStream();
+    } else {
+        startPolling();
+    }
 });
 
+function startPolling() {
+    if (pollTimer) {
+        return;
+    }
+    
+    fetchData();
+    pollTimer = setInterval(fetchData, POLL_INTERVAL);
+}
+
+// Open the live stream: one snapshot, then only new readings, alerts and
+// recommendation changes
+function startStream() {
+    const source = new EventSource(`${API_BASE}/stream`);
+    
+    source.addEventListener('snapshot', event => {
+        const data = JSON.parse(event.data);
+        
+        updateCurrentReadings(data.current);
+        updateCharts(data.historical);
+        updateHealthScore(data.healthScore);
+        activeAlerts = data.alerts;
+        updateAlerts(activeAlerts);
+        fetchRecommendations();
+    });
+    
+    source.addEventListener('reading', event => {
+        const reading = JSON.parse(event.data);
+        
+        updateCurrentReadings(reading);
+        appendReading(reading);
+        updateHealthScore(reading.healthScore);
+        
+        // Refresh recommendations at most once per polling interval;
+        // changes made in between arrive as recommendation events
+        if (Date.now() - lastRecommendationFetch >= POLL_INTERVAL) {
+            fetchRecommendations();
+        }
+    });
+    
+    source.addEventListener('alert', event => {
+        activeAlerts.push(JSON.parse(event.data));
+        updateAlerts(activeAlerts);
+    });
+    
+    source.addEventListener('alert_resolved', event => {
+        const resolved = JSON.parse(event.data);
+        activeAlerts = activeAlerts.filter(alert => alert.id !== resolved.id);
+        updateAlerts(activeAlerts);
+    });
+    
+    source.addEventListener('recommendation', event => {
+        const data = JSON.parse(event.data);
+        
+        if (data.type === 'crop') {
+            updateCropRecommendations(data.recommendations);
+        } else {
+            updateFertilizerRecommendation(data.recommendation);
+        }
+    });
+    
+    source.onerror = () => {
+        // EventSource retries on its own unless the server refused the stream
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    };
+}
+
 // Initialize charts
 function initializeCharts() {
     // Moisture chart
@@ -75,22 +154,34 @@ function initializeCharts() {
 // Fetch data from server
 async function fetchData() {
     try {
-        const response = await fetch('http://localhost:5000/api/analytics/current');
+        const response = await fetch(`${API_BASE}/analytics/current`);
         const data = await response.json();
         
         updateCurrentReadings(data.current);
         updateCharts(data.historical);
         updateHealthScore(data.healthScore);
-        updateAlerts(data.alerts);
+        activeAlerts = data.alerts;
+        updateAlerts(activeAlerts);
+        
+        await fetchRecommendations();
         
-        // Fetch recommendations
-        const cropResponse = await fetch('http://localhost:5000/api/recommendations/crops');
+    } catch (error) {
+        console.error('Error fetching data:', error);
+    }
+}
+
+// Fetch recommendations and the yield prediction for the top crop
+async function fetchRecommendations() {
+    lastRecommendationFetch = Date.now();
+    
+    try {
+        const cropResponse = await fetch(`${API_BASE}/recommendations/crops`);
         const cropData = await cropResponse.json();
         
-        const fertilizerResponse = await fetch('http://localhost:5000/api/recommendations/fertilizer?crop=' + encodeURIComponent(cropData.recommendations[0].crop));
+        const fertilizerResponse = await fetch(`${API_BASE}/recommendations/fertilizer?crop=` + encodeURIComponent(cropData.recommendations[0].crop));
         const fertilizerData = await fertilizerResponse.json();
         
-        const yieldResponse = await fetch('http://localhost:5000/api/analytics/yield-prediction?crop=' + encodeURIComponent(cropData.recommendations[0].crop));
+        const yieldResponse = await fetch(`${API_BASE}/analytics/yield-prediction?crop=` + encodeURIComponent(cropData.recommendations[0].crop));
         const yieldData = await yieldResponse.json();
         
         updateRecommendations({
@@ -105,7 +196,7 @@ async function fetchData() {
         });
         
     } catch (error) {
-        console.error('Error fetching data:', error);
+        console.error('Error fetching recommendations:', error);
     }
 }
 
@@ -135,13 +226,32 @@ function updateCharts(historicalData) {
     charts.nutrient.update();
 }
 
+// Append a streamed reading to the charts
+function appendReading(reading) {
+    charts.moisture.data.labels.push(reading.timestamp);
+    charts.moisture.data.datasets[0].data.push(reading.moisture);
+    
+    if (charts.moisture.data.labels.length > MAX_CHART_POINTS) {
+        charts.moisture.data.labels.shift();
+        charts.moisture.data.datasets[0].data.shift();
+    }
+    charts.moisture.update();
+    
+    charts.nutrient.data.datasets[0].data = [reading.nitrogen, reading.phosphorus, reading.potassium];
+    charts.nutrient.update();
+}
+
 // Update recommendations
 function updateRecommendations(recommendations) {
-    // Crop recommendations
+    updateCropRecommendations(recommendations.crops);
+    updateFertilizerRecommendation(recommendations.fertilizer);
+}
+
+function updateCropRecommendations(crops) {
     const cropContainer = document.getElementById('crop-recommendations');
     cropContainer.innerHTML = '';
     
-    recommendations.crops.forEach(crop => {
+    crops.forEach(crop => {
         const div = document.createElement('div');
         div.className = 'recommendation-item';
         div.innerHTML = `
@@ -149,16 +259,17 @@ function updateRecommendations(recommendations) {
         `;
         cropContainer.appendChild(div);
     });
-    
-    // Fertilizer recommendations
+}
+
+function updateFertilizerRecommendation(fertilizer) {
     const fertilizerContainer = document.getElementById('fertilizer-recommendations');
     fertilizerContainer.innerHTML = '';
     
     const div = document.createElement('div');
     div.className = 'recommendation-item';
     div.innerHTML = `
-        ${recommendations.fertilizer.fertilizer} for ${recommendations.fertilizer.crop} 
-        <span class="probability">${(recommendations.fertilizer.probability * 100).toFixed(1)}%</span>
+        ${fertilizer.fertilizer} for ${fertilizer.crop} 
+        <span class="probability">${(fertilizer.probability * 100).toFixed(1)}%</span>
     `;
     fertilizerContainer.appendChild(div);
 }